@@ -2,11 +2,44 @@
 数据库配置管理
 """
 import os
+import time
+import threading
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+# 进程内共享的 mysql.connector 连接池，按池名缓存 (连接池, pool_size, pool_reset_session)
+_mysql_pools = {}
+_mysql_pools_lock = threading.Lock()
+
+
+class WaitingConnectionPool:
+    """MySQLConnectionPool 的包装：连接耗尽时在 timeout 秒内等待其他线程归还连接
+    
+    MySQLConnectionPool.get_connection() 在池中没有空闲连接时立即抛出 PoolError，
+    这里改为短暂轮询重试，超时后仍抛出 PoolError。其余属性直接转发给原连接池。
+    """
+    
+    def __init__(self, pool, timeout: float, interval: float = 0.05):
+        self._pool = pool
+        self.timeout = timeout
+        self.interval = interval
+    
+    def get_connection(self):
+        from mysql.connector.errors import PoolError
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                return self._pool.get_connection()
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(self.interval)
+    
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
 
 class DatabaseConfig:
     """数据库配置类"""
@@ -40,6 +73,46 @@ class DatabaseConfig:
             'echo': False
         }
     
+    def get_mysql_pool(self, pool_name: str = 'sync', pool_size: int = 8,
+                       pool_reset_session: bool = True):
+        """获取进程内共享的 mysql.connector 连接池（首次调用时创建）
+        
+        从池中取出的连接调用 close() 即归还到池中，不会断开 TCP 连接。
+        只读场景可传入 pool_reset_session=False，归还时跳过会话重置。
+        同名连接池已用不同参数创建时抛出 ValueError。
+        
+        pool_size 即同时借出连接数的上限（创建时即建立全部连接）。超出上限的借用方
+        最多等待 pool_timeout 秒（DB_POOL_TIMEOUT），仍无连接归还时抛出 PoolError。
+        """
+        with _mysql_pools_lock:
+            cached = _mysql_pools.get(pool_name)
+            if cached is not None:
+                pool, cached_size, cached_reset = cached
+                if (cached_size, cached_reset) != (pool_size, pool_reset_session):
+                    raise ValueError(
+                        f"连接池 {pool_name} 已按 pool_size={cached_size}, "
+                        f"pool_reset_session={cached_reset} 创建，"
+                        f"与本次请求的 pool_size={pool_size}, pool_reset_session={pool_reset_session} 不一致"
+                    )
+            else:
+                from mysql.connector.pooling import MySQLConnectionPool
+                pool = WaitingConnectionPool(MySQLConnectionPool(
+                    pool_name=pool_name,
+                    pool_size=pool_size,
+                    pool_reset_session=pool_reset_session,
+                    host=self.host,
+                    port=int(self.port),
+                    user=self.user,
+                    password=self.password,
+                    database=self.database,
+                    autocommit=True,
+                    use_unicode=True,
+                    charset='utf8mb4',
+                    use_pure=False
+                ), timeout=self.pool_timeout)
+                _mysql_pools[pool_name] = (pool, pool_size, pool_reset_session)
+            return pool
+    
     def validate_config(self) -> bool:
         """验证配置有效性"""
         required_fields = [self.user, self.password, self.host, self.database]
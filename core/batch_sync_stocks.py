@@ -5,7 +5,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database_config import DatabaseConfig
+from core.sync_state import ensure_sync_state_table, refresh_sync_state
 import time
+import threading
 from datetime import datetime
 import logging
 from utils.error_handler import (
@@ -23,6 +25,62 @@ logging.basicConfig(
     ]
 )
 
+# 历史行情写入列（股票代码之外的列，与akshare返回的列名一致）
+HIST_COLUMNS = ['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额', '振幅', '涨跌幅', '涨跌额', '换手率']
+# 同步历史行情时必须存在的列
+STOCK_DAILY_COLS = frozenset({'日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额'})
+
+HIST_UPSERT_SQL = """
+    INSERT INTO stock_stock_zh_a_hist 
+    (日期, 股票代码, 开盘, 收盘, 最高, 最低, 成交量, 成交额, 振幅, 涨跌幅, 涨跌额, 换手率)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        开盘 = VALUES(开盘), 收盘 = VALUES(收盘), 最高 = VALUES(最高), 最低 = VALUES(最低),
+        成交量 = VALUES(成交量), 成交额 = VALUES(成交额), 振幅 = VALUES(振幅),
+        涨跌幅 = VALUES(涨跌幅), 涨跌额 = VALUES(涨跌额), 换手率 = VALUES(换手率)
+"""
+
+PROXY_VARS = ('HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy')
+
+_proxy_lock = threading.Lock()
+_proxy_disabled = False
+
+def disable_proxy_for_process():
+    """在整个进程内禁用代理（只执行一次）
+
+    环境变量是进程级共享的，多线程同步时不能在每次请求前后修改再恢复，
+    否则一个线程恢复代理时另一个线程可能正在请求。应在启动线程池前调用。
+    """
+    global _proxy_disabled
+    if _proxy_disabled:
+        return
+    with _proxy_lock:
+        if _proxy_disabled:
+            return
+        for var in PROXY_VARS:
+            os.environ.pop(var, None)
+        os.environ['NO_PROXY'] = '*'
+        _proxy_disabled = True
+
+def bulk_insert_hist(conn, rows, chunk_size=1000, commit=True):
+    """批量写入历史行情，每chunk_size行一次executemany；(股票代码, 日期)重复时更新已有记录
+
+    commit=True 时每批单独提交；commit=False 时不提交也不回滚，由调用方在同一事务中统一处理。
+    """
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), chunk_size):
+            cursor.executemany(HIST_UPSERT_SQL, rows[start:start + chunk_size])
+            if commit:
+                conn.commit()
+        return len(rows)
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
 class BatchStockSync:
     def __init__(self):
         self.db_config = DatabaseConfig()
@@ -32,6 +90,8 @@ class BatchStockSync:
         self.error_handler = ErrorHandler(__name__)
         self.safe_executor = SafeExecutor(self.error_handler)
         self.logger = logging.getLogger(__name__)
+        # 检查点表可用时才在写入后刷新同步状态
+        self.sync_state_enabled = False
     
     @retry_on_error(DATABASE_RETRY_CONFIG)
     def connect_database(self):
@@ -47,6 +107,15 @@ class BatchStockSync:
                 connect_timeout=30,
                 pool_reset_session=True
             )
+            # 检查点表只是优化，数据库用户没有建表权限时仍允许同步
+            cursor = self.conn.cursor()
+            try:
+                ensure_sync_state_table(cursor)
+                self.sync_state_enabled = True
+            except Exception as e:
+                self.logger.warning(f"创建同步检查点表失败，将不更新检查点: {e}")
+            finally:
+                cursor.close()
             self.logger.info("数据库连接成功")
             print("数据库连接成功")
             return True
@@ -97,7 +166,7 @@ class BatchStockSync:
                 DataValidator.validate_dataframe(
                     df, 
                     min_rows=1,
-                    required_columns=['日期', '开盘', '收盘', '最高', '最低', '成交量', '成交额']
+                    required_columns=STOCK_DAILY_COLS
                 )
             except ValueError as e:
                 self.error_handler.handle_error(e, f"数据验证失败 - {stock_code}")
@@ -117,6 +186,50 @@ class BatchStockSync:
             print(f"同步 {stock_code} 失败: {error_info['message']}")
             return False
     
+    def sync_stock_incremental(self, stock_code, stock_name, start_date):
+        """增量同步单只股票：只获取start_date(YYYYMMDD)之后的数据并批量写入"""
+        try:
+            DataValidator.validate_stock_code(stock_code)
+            
+            self.logger.info(f"开始增量同步股票 {stock_code} ({stock_name}) 从 {start_date}")
+            df = self._fetch_stock_data_with_retry(stock_code, start_date)
+            if df is None:
+                return False
+            
+            rows = [
+                (row[0], stock_code, *row[1:])
+                for row in df[HIST_COLUMNS].itertuples(index=False, name=None)
+            ]
+            # 删除、写入和检查点更新在同一事务中提交，任何一步失败都整体回滚，
+            # 使带重叠窗口的增量同步可以重复执行且能覆盖交易所的数据修正
+            cursor = self.conn.cursor()
+            try:
+                if rows:
+                    cursor.execute(
+                        "DELETE FROM stock_stock_zh_a_hist WHERE 股票代码 = %s AND 日期 >= %s",
+                        (stock_code, datetime.strptime(start_date, '%Y%m%d').strftime('%Y-%m-%d'))
+                    )
+                    bulk_insert_hist(self.conn, rows, commit=False)
+                # 更新同步状态检查点
+                self._refresh_sync_state(cursor, stock_code)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+            self.logger.info(f"成功增量同步股票 {stock_code}: {len(rows)} 条记录")
+            return True
+            
+        except Exception as e:
+            self.error_handler.handle_error(e, f"增量同步股票 {stock_code}")
+            return False
+    
+    def _refresh_sync_state(self, cursor, stock_code):
+        """写入历史行情后刷新该股票的同步检查点（检查点表不可用时跳过）"""
+        if self.sync_state_enabled:
+            refresh_sync_state(cursor, [stock_code])
+    
     def _process_list_date(self, list_date):
         """处理上市日期格式"""
         if list_date:
@@ -138,48 +251,21 @@ class BatchStockSync:
     
     def _fetch_stock_data_with_retry(self, stock_code, start_date):
         """获取股票数据，带网络优化的重试机制"""
+        # 直连数据源，不经过代理（进程级设置，只生效一次）
+        disable_proxy_for_process()
         # 网络优化配置
         retry_config = RetryConfig(max_retries=5, delay=3.0, backoff=1.5)
         
         @retry_on_error(retry_config)
         def _fetch_with_network_fix():
-            try:
-                # 临时禁用代理
-                import os
-                original_proxies = {}
-                proxy_vars = ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']
-                
-                # 保存原始代理设置
-                for var in proxy_vars:
-                    if var in os.environ:
-                        original_proxies[var] = os.environ[var]
-                        del os.environ[var]
-                
-                try:
-                    # 设置无代理环境
-                    os.environ['NO_PROXY'] = '*'
-                    
-                    # 调用akshare接口
-                    df = ak.stock_zh_a_hist(
-                        symbol=stock_code,
-                        period="daily", 
-                        start_date=start_date,
-                        end_date=datetime.now().strftime('%Y%m%d'),
-                        adjust=""
-                    )
-                    
-                    return df
-                    
-                finally:
-                    # 恢复原始代理设置
-                    for var, value in original_proxies.items():
-                        os.environ[var] = value
-                    if 'NO_PROXY' in os.environ:
-                        del os.environ['NO_PROXY']
-                        
-            except Exception as e:
-                # 重新抛出异常让重试机制处理
-                raise e
+            # 调用akshare接口
+            return ak.stock_zh_a_hist(
+                symbol=stock_code,
+                period="daily", 
+                start_date=start_date,
+                end_date=datetime.now().strftime('%Y%m%d'),
+                adjust=""
+            )
         
         try:
             df = _fetch_with_network_fix()
@@ -222,6 +308,7 @@ class BatchStockSync:
                 
                 # 批量执行插入
                 cursor.executemany(insert_query, data_to_insert)
+                self._refresh_sync_state(cursor, stock_code)
                 return True
                 
             finally:
@@ -400,6 +487,7 @@ class BatchStockSync:
                         row['振幅'], row['涨跌幅'], row['涨跌额'], row['换手率']
                     ))
                 
+                self._refresh_sync_state(cursor, stock_code)
                 return True
                 
             finally:
@@ -70,7 +70,7 @@ class GentleStockSyncTool(SmartStockSync):
                 self.update_heartbeat(stock_code, "获取股票数据")
                 
                 # 执行同步
-                if self.syncer.sync_stock_data(stock_code, stock_name, list_date):
+                if self.syncer.sync_single_stock(stock_code, stock_name, list_date):
                     self.update_heartbeat(stock_code, "同步成功")
                     print("成功")
                     return True
@@ -6,8 +6,65 @@ import sys
 import time
 import json
 import os
-from datetime import datetime
-from batch_sync_stocks import BatchStockSync
+import threading
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.batch_sync_stocks import BatchStockSync
+
+# 进程内同步时每个工作线程复用一个同步器（及其数据库连接）
+_thread_state = threading.local()
+_thread_syncers = []
+_thread_syncers_lock = threading.Lock()
+
+def _get_thread_syncer():
+    """获取当前线程的同步器，首次调用时建立数据库连接"""
+    syncer = getattr(_thread_state, 'syncer', None)
+    if syncer is None:
+        syncer = BatchStockSync()
+        if not syncer.connect_database():
+            return None
+        _thread_state.syncer = syncer
+        with _thread_syncers_lock:
+            _thread_syncers.append(syncer)
+    return syncer
+
+def close_thread_syncers():
+    """关闭所有工作线程的同步器连接，应在线程池关闭后调用"""
+    with _thread_syncers_lock:
+        syncers = _thread_syncers[:]
+        _thread_syncers.clear()
+    for syncer in syncers:
+        syncer.close()
+
+def sync_stock(stock_code):
+    """在当前进程内同步单只股票，返回是否成功"""
+    syncer = _get_thread_syncer()
+    if syncer is None:
+        return False
+    return syncer.sync_by_stock_code(stock_code)
+
+def sync_stock_from(stock_code, stock_name, start_date):
+    """在当前进程内从 start_date(YYYYMMDD) 开始增量同步单只股票，返回是否成功"""
+    syncer = _get_thread_syncer()
+    if syncer is None:
+        return False
+    return syncer.sync_stock_incremental(stock_code, stock_name, start_date)
+
+def sync_stock_chunk(stocks):
+    """增量同步一批股票，整批复用当前线程的数据库连接
+    
+    stocks 中每项需包含 code、name、latest_date，从 latest_date 的下一天开始获取数据。
+    返回与 stocks 对应的成功标志列表。
+    """
+    syncer = _get_thread_syncer()
+    if syncer is None:
+        return [False] * len(stocks)
+    
+    results = []
+    for stock in stocks:
+        start_date = (stock['latest_date'] + timedelta(days=1)).strftime('%Y%m%d')
+        results.append(syncer.sync_stock_incremental(stock['code'], stock['name'], start_date))
+    return results
 
 class SmartStockSync:
     def __init__(self):
@@ -38,12 +95,16 @@ class SmartStockSync:
                 return None
         return None
     
-    def sync_with_retry(self, stock_code, stock_name, list_date, max_retries=3):
-        """带重试机制的同步"""
+    def sync_with_retry(self, stock_code, stock_name, list_date, max_retries=3, fetch_start=None):
+        """带重试机制的同步；指定 fetch_start(YYYY-MM-DD) 时只增量同步该日期之后的数据"""
         for attempt in range(max_retries):
             try:
                 print(f"  尝试 {attempt + 1}/{max_retries}: ", end="")
-                if self.syncer.sync_single_stock(stock_code, stock_name, list_date):
+                if fetch_start:
+                    ok = self.syncer.sync_stock_incremental(stock_code, stock_name, fetch_start.replace('-', ''))
+                else:
+                    ok = self.syncer.sync_single_stock(stock_code, stock_name, list_date)
+                if ok:
                     print("成功")
                     return True
                 else:
@@ -103,63 +164,139 @@ class SmartStockSync:
             if max_stocks:
                 remaining_stocks = remaining_stocks[:max_stocks]
             
-            total_count = len(remaining_stocks)
-            
             print(f"从股票 {start_code} 开始继续同步")
-            print(f"计划同步 {total_count} 只股票")
-            print("=" * 50)
+            self._sync_stocks(remaining_stocks)
             
-            success_count = 0
-            failed_count = 0
-            failed_stocks = []
+        finally:
+            self.syncer.close()
+    
+    def _sync_stocks(self, stocks, fetch_starts=None):
+        """依次同步股票列表，复用同一个数据库连接
+        
+        stocks 为 (代码, 简称, 上市日期) 列表；fetch_starts 为 代码 -> 增量起始日期 的映射，
+        未包含的股票从上市日期开始完整同步。
+        """
+        fetch_starts = fetch_starts or {}
+        total_count = len(stocks)
+        
+        print(f"计划同步 {total_count} 只股票")
+        print("=" * 50)
+        
+        success_count = 0
+        failed_count = 0
+        failed_stocks = []
+        
+        for i, (stock_code, stock_name, list_date) in enumerate(stocks, 1):
+            print(f"[{i}/{total_count}] {stock_code} ({stock_name})")
             
-            for i, (stock_code, stock_name, list_date) in enumerate(remaining_stocks, 1):
-                print(f"[{i}/{total_count}] {stock_code} ({stock_name})")
+            try:
+                if self.sync_with_retry(stock_code, stock_name, list_date,
+                                        fetch_start=fetch_starts.get(stock_code)):
+                    success_count += 1
+                else:
+                    failed_count += 1
+                    failed_stocks.append({
+                        "code": stock_code,
+                        "name": stock_name,
+                        "list_date": list_date
+                    })
+                    print(f"  [X] 失败: {stock_code} ({stock_name})")
                 
-                try:
-                    if self.sync_with_retry(stock_code, stock_name, list_date):
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                        failed_stocks.append({
-                            "code": stock_code,
-                            "name": stock_name,
-                            "list_date": list_date
-                        })
-                        print(f"  [X] 失败: {stock_code} ({stock_name})")
-                    
-                    # 保存进度
-                    self.save_progress(stock_code, success_count, failed_count, failed_stocks)
-                    
-                    # 每10只股票休息一下
-                    if i % 10 == 0:
-                        time.sleep(3)
-                        print(f"  [休息] 已处理 {i} 只股票，休息3秒...")
-                    
-                    # 每50只股票显示进度
-                    if i % 50 == 0:
-                        progress = i / total_count * 100
-                        print(f"  [进度] 进度: {i}/{total_count} ({progress:.1f}%)")
-                        print(f"  [统计] 成功: {success_count}, 失败: {failed_count}")
+                # 保存进度
+                self.save_progress(stock_code, success_count, failed_count, failed_stocks)
                 
-                except KeyboardInterrupt:
-                    print(f"\n[中断] 用户中断，已处理 {i} 只股票")
-                    print(f"[统计] 成功: {success_count}, 失败: {failed_count}")
-                    self.save_progress(stock_code, success_count, failed_count, failed_stocks)
-                    break
+                # 每10只股票休息一下
+                if i % 10 == 0:
+                    time.sleep(3)
+                    print(f"  [休息] 已处理 {i} 只股票，休息3秒...")
+                
+                # 每50只股票显示进度
+                if i % 50 == 0:
+                    progress = i / total_count * 100
+                    print(f"  [进度] 进度: {i}/{total_count} ({progress:.1f}%)")
+                    print(f"  [统计] 成功: {success_count}, 失败: {failed_count}")
             
-            print("\n" + "=" * 50)
-            print(f"[完成] 同步完成 - 成功: {success_count}, 失败: {failed_count}")
+            except KeyboardInterrupt:
+                print(f"\n[中断] 用户中断，已处理 {i} 只股票")
+                print(f"[统计] 成功: {success_count}, 失败: {failed_count}")
+                self.save_progress(stock_code, success_count, failed_count, failed_stocks)
+                break
+        
+        print("\n" + "=" * 50)
+        print(f"[完成] 同步完成 - 成功: {success_count}, 失败: {failed_count}")
+        
+        if failed_stocks:
+            print(f"\n[失败] 失败的股票 ({len(failed_stocks)} 只):")
+            for stock in failed_stocks:
+                print(f"  {stock['code']} ({stock['name']})")
             
-            if failed_stocks:
-                print(f"\n[失败] 失败的股票 ({len(failed_stocks)} 只):")
-                for stock in failed_stocks:
-                    print(f"  {stock['code']} ({stock['name']})")
-                
-                # 保存失败的股票列表
-                with open(self.failed_stocks_file, 'w', encoding='utf-8') as f:
-                    json.dump(failed_stocks, f, ensure_ascii=False, indent=2)
-                print(f"\n失败的股票已保存到: {self.failed_stocks_file}")
+            # 保存失败的股票列表
+            with open(self.failed_stocks_file, 'w', encoding='utf-8') as f:
+                json.dump(failed_stocks, f, ensure_ascii=False, indent=2)
+            print(f"\n失败的股票已保存到: {self.failed_stocks_file}")
+    
+    def read_codes_file(self, codes_file):
+        """读取股票代码文件
+        
+        每行格式为 "<股票代码> [增量起始日期YYYY-MM-DD]"，# 之后为注释。
+        返回 (股票代码列表, 代码 -> 增量起始日期 的映射)。
+        """
+        codes = []
+        fetch_starts = {}
+        with open(codes_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if not fields:
+                    continue
+                codes.append(fields[0])
+                if len(fields) > 1:
+                    fetch_starts[fields[0]] = fields[1]
+        return codes, fetch_starts
+    
+    def sync_from_codes_file(self, codes_file):
+        """在同一进程内同步代码文件中列出的所有股票"""
+        try:
+            codes, fetch_starts = self.read_codes_file(codes_file)
+        except OSError as e:
+            print(f"读取股票代码文件失败: {e}")
+            return
+        
+        if not codes:
+            print(f"股票代码文件为空: {codes_file}")
+            return
+        
+        if not self.syncer.connect_database():
+            print("数据库连接失败")
+            return
+        
+        try:
+            def _get_stocks(connection):
+                cursor = connection.cursor()
+                try:
+                    placeholders = ', '.join(['%s'] * len(codes))
+                    cursor.execute(
+                        f"SELECT A股代码, A股简称, A股上市日期 FROM stock_stock_info WHERE A股代码 IN ({placeholders})",
+                        codes
+                    )
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+            
+            stock_info = self.syncer.safe_executor.safe_execute(
+                _get_stocks, self.syncer.conn,
+                default_return=[],
+                context="获取股票代码文件中的股票信息"
+            )
+            
+            # 保持代码文件中的顺序（即优先级顺序）
+            info_by_code = {row[0]: row for row in stock_info}
+            missing = [code for code in codes if code not in info_by_code]
+            if missing:
+                print(f"未找到 {len(missing)} 个股票代码: {', '.join(missing[:10])}")
+            
+            stocks = [info_by_code[code] for code in codes if code in info_by_code]
+            print(f"从文件 {codes_file} 读取 {len(stocks)} 只股票")
+            self._sync_stocks(stocks, fetch_starts)
             
         finally:
             self.syncer.close()
@@ -237,12 +374,14 @@ def main():
         print("智能股票同步工具")
         print("用法:")
         print("  python smart_stock_sync.py continue <起始股票代码> [最大数量]")
+        print("  python smart_stock_sync.py continue --codes-file <股票代码文件>")
         print("  python smart_stock_sync.py retry")
         print("  python smart_stock_sync.py status")
         print()
         print("例如:")
         print("  python smart_stock_sync.py continue 000786")
         print("  python smart_stock_sync.py continue 000786 100")
+        print("  python smart_stock_sync.py continue --codes-file scripts/sync_codes_priority_1.txt")
         print("  python smart_stock_sync.py retry")
         return
     
@@ -253,6 +392,21 @@ def main():
             print("请指定起始股票代码")
             return
         
+        if sys.argv[2] == "--codes-file":
+            if len(sys.argv) < 4:
+                print("请指定股票代码文件")
+                return
+            
+            codes_file = sys.argv[3]
+            print(f"准备同步文件 {codes_file} 中的股票...")
+            confirm = input("确认开始同步吗？(y/N): ")
+            if confirm.lower() not in ['y', 'yes', '是']:
+                print("操作已取消")
+                return
+            
+            sync_tool.sync_from_codes_file(codes_file)
+            return
+        
         start_code = sys.argv[2]
         max_stocks = None
         
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+股票同步状态检查点
+
+stock_sync_state 表按股票保存历史行情的记录数和日期范围。同步程序写入
+历史行情后刷新对应股票的检查点，分析工具读取检查点即可判断同步需求，
+无需每次对整张历史行情表做 GROUP BY 聚合。分析工具只读取检查点，
+检查点不存在或落后于历史行情表的最后写入时间时改为直接统计历史行情表。
+"""
+from datetime import timedelta
+
+# 写入历史行情与刷新检查点之间（提交前后）允许的时间差
+SYNC_STATE_TOLERANCE = timedelta(seconds=60)
+
+SYNC_STATE_DDL = """
+    CREATE TABLE IF NOT EXISTS stock_sync_state (
+        股票代码 VARCHAR(10) NOT NULL PRIMARY KEY,
+        record_count INT NOT NULL,
+        earliest_date DATE NULL,
+        latest_date DATE NULL,
+        checked_at DATETIME NOT NULL
+    ) DEFAULT CHARSET=utf8mb4
+"""
+
+def ensure_sync_state_table(cursor):
+    """创建检查点表（已存在时不做任何操作）"""
+    cursor.execute(SYNC_STATE_DDL)
+
+def refresh_sync_state(cursor, stock_codes=None):
+    """从历史行情表重新统计股票并写入检查点，stock_codes 为None时统计全部股票
+    
+    没有历史数据的股票也会写入一行（record_count 为0），避免每次都被当作检查点缺失。
+    """
+    where_clause = ""
+    params = ()
+    if stock_codes is not None:
+        if not stock_codes:
+            return
+        where_clause = "WHERE s.A股代码 IN (" + ", ".join(["%s"] * len(stock_codes)) + ")"
+        params = tuple(stock_codes)
+    
+    cursor.execute(f"""
+        INSERT INTO stock_sync_state (股票代码, record_count, earliest_date, latest_date, checked_at)
+        SELECT s.A股代码, COUNT(h.日期), MIN(h.日期), MAX(h.日期), NOW()
+        FROM stock_stock_info s
+        LEFT JOIN stock_stock_zh_a_hist h ON h.股票代码 = s.A股代码
+        {where_clause}
+        GROUP BY s.A股代码
+        ON DUPLICATE KEY UPDATE
+            record_count = VALUES(record_count), earliest_date = VALUES(earliest_date),
+            latest_date = VALUES(latest_date), checked_at = VALUES(checked_at)
+    """, params)
+
+def sync_state_is_current(cursor):
+    """只读检查：检查点表存在，且最近一次刷新不早于历史行情表的最后写入时间
+    
+    历史行情表的 UPDATE_TIME 为NULL（服务器重启后尚无写入）时视为检查点有效。
+    """
+    # MySQL 8 默认缓存 information_schema 统计信息，读取前临时关闭缓存以获得实时的 UPDATE_TIME；
+    # 连接池不重置会话，读取后恢复原值，避免影响后续借用该连接的查询
+    previous_expiry = None
+    try:
+        cursor.execute("SELECT @@SESSION.information_schema_stats_expiry")
+        previous_expiry = cursor.fetchone()[0]
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+    except Exception:
+        pass
+    
+    try:
+        cursor.execute("""
+            SELECT TABLE_NAME, UPDATE_TIME
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND TABLE_NAME IN ('stock_sync_state', 'stock_stock_zh_a_hist')
+        """)
+        update_times = dict(cursor.fetchall())
+    finally:
+        if previous_expiry is not None:
+            cursor.execute("SET SESSION information_schema_stats_expiry = %s", (int(previous_expiry),))
+    if 'stock_sync_state' not in update_times:
+        return False
+    
+    cursor.execute("SELECT MAX(checked_at) FROM stock_sync_state")
+    last_checked = cursor.fetchone()[0]
+    if last_checked is None:
+        return False
+    
+    hist_updated = update_times.get('stock_stock_zh_a_hist')
+    return hist_updated is None or hist_updated <= last_checked + SYNC_STATE_TOLERANCE
@@ -50,7 +50,7 @@ class TimeoutStockSyncTool(SmartStockSyncTool):
                 
                 # 使用超时处理
                 with timeout_handler(self.sync_timeout):
-                    if self.syncer.sync_stock_data(stock_code, stock_name, list_date):
+                    if self.syncer.sync_single_stock(stock_code, stock_name, list_date):
                         print("成功")
                         return True
                     else:
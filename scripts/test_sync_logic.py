@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+测试同步相关的纯逻辑（不需要数据库和网络）
+"""
+import os
+import sys
+import json
+import logging
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+import pandas as pd
+
+from utils.error_handler import ErrorHandler, ErrorInfo, RetryConfig
+from utils.logger_util import FastJSONFormatter
+
+
+def test_error_info_dict_access():
+    """ErrorInfo 兼容原先返回字典的下标访问"""
+    error_info = ErrorHandler(__name__).handle_error(ValueError("bad value"), "测试", log=False)
+
+    assert isinstance(error_info, ErrorInfo)
+    assert error_info['message'] == "bad value" == error_info.message
+    assert error_info['type'] == "数据错误"
+    assert error_info['context'] == "测试"
+    assert error_info['recoverable'] is False
+    assert error_info['timestamp'] == error_info.timestamp
+
+    try:
+        error_info['missing']
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("未知键应抛出 KeyError")
+
+
+def test_retry_delay_bounds():
+    """各 jitter 策略的等待时间落在预期区间内"""
+    samples = 500
+
+    config = RetryConfig(delay=1.0, backoff=2.0, jitter="none")
+    assert [config.get_delay(attempt) for attempt in range(4)] == [1.0, 2.0, 4.0, 8.0]
+
+    for attempt in range(5):
+        base = 1.0 * 2.0 ** attempt
+
+        config = RetryConfig(delay=1.0, backoff=2.0, jitter="full")
+        assert all(0 <= config.get_delay(attempt) <= base for _ in range(samples))
+
+        config = RetryConfig(delay=1.0, backoff=2.0, jitter="equal")
+        assert all(base / 2 <= config.get_delay(attempt) <= base for _ in range(samples))
+
+    config = RetryConfig(delay=1.0, jitter="decorrelated", max_delay=20.0)
+    delay = None
+    for attempt in range(samples):
+        previous = delay or config.delay
+        delay = config.get_delay(attempt, delay)
+        assert config.delay <= delay <= min(config.max_delay, previous * 3)
+
+    # 指数增长受 max_delay 限制
+    config = RetryConfig(delay=1.0, backoff=2.0, jitter="none", max_delay=5.0)
+    assert config.get_delay(10) == 5.0
+
+    try:
+        RetryConfig(jitter="random")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("不支持的 jitter 类型应抛出 ValueError")
+
+
+def test_classify_sync_status_matches_row_rule():
+    """向量化判断与逐行判断 is_stock_fully_synced 结果一致"""
+    from enhanced_sync_checker import EnhancedSyncChecker
+
+    checker = EnhancedSyncChecker()
+    today = checker._today
+    recent = today - timedelta(days=2)
+    stale = today - timedelta(days=30)
+    old_list = date(2010, 1, 4)
+    new_list = today - timedelta(days=30)
+
+    # (上市日期, 记录数, 最早日期, 最新日期)
+    fixture = [
+        (old_list, 0, old_list, recent),                           # 没有数据
+        (old_list, 3000, old_list, recent),                        # 老股票完整
+        (old_list, 3000, old_list, stale),                         # 数据过旧
+        (old_list, 50, old_list, recent),                          # 记录数过少
+        (old_list, 3000, old_list + timedelta(days=365), recent),  # 缺少早期数据
+        (new_list, 20, new_list, recent),                          # 新股数据充足
+        (new_list, 2, new_list, recent),                           # 新股数据不足
+        ("2010-01-04", 50, old_list, recent),                      # 字符串上市日期：逐行判断跳过
+        (None, 3000, old_list, stale),                             # 无上市日期，只检查时效性
+    ]
+    merged = pd.DataFrame(
+        [(f"{i:06d}", f"股票{i}") + row for i, row in enumerate(fixture)],
+        columns=['code', 'name', 'list_date', 'record_count', 'earliest_date', 'latest_date']
+    )
+
+    synced_mask, has_hist = checker.classify_sync_status(merged)
+    expected = [
+        checker.is_stock_fully_synced(code, name, list_date, record_count, earliest_date, latest_date)
+        for code, name, list_date, record_count, earliest_date, latest_date
+        in merged.itertuples(index=False, name=None)
+    ]
+
+    assert has_hist.all()
+    assert synced_mask.tolist() == expected, (synced_mask.tolist(), expected)
+    assert expected == [False, True, False, False, False, True, False, True, False]
+
+
+def test_trading_calendar_bitmap():
+    """交易日位图与节假日/调休集合的计算结果一致"""
+    from daily_sync_scheduler import TradingCalendar
+
+    calendar = TradingCalendar()
+    holidays = frozenset(calendar.holidays_2025)
+    makeup_days = frozenset(calendar.makeup_workdays_2025)
+
+    day = date(2024, 12, 1)
+    while day < date(2026, 2, 1):
+        if day in holidays:
+            expected = False
+        elif day.weekday() >= 5:
+            expected = day in makeup_days
+        else:
+            expected = True
+        assert calendar.is_trading_day(day) == expected, day
+        day += timedelta(days=1)
+
+
+def test_fast_json_formatter_escaping():
+    """NDJSON 日志行可被 json 解析，特殊字符正确转义"""
+    formatter = FastJSONFormatter()
+    message = 'quote " backslash \\ newline \n tab \t 中文 \x01'
+    record = logging.LogRecord('name"with\\quote', logging.WARNING, __file__, 1,
+                               '%s', (message,), None)
+
+    line = formatter.format(record)
+    assert '\n' not in line
+    parsed = json.loads(line)
+    assert parsed['m'] == message
+    assert parsed['n'] == 'name"with\\quote'
+    assert parsed['lv'] == 'WARNING'
+    assert parsed['t'] == formatter.formatTime(record, '%Y-%m-%d %H:%M:%S')
+
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = logging.LogRecord('t', logging.ERROR, __file__, 1, 'failed', None, sys.exc_info())
+    parsed = json.loads(formatter.format(record))
+    assert parsed['m'].startswith('failed\nTraceback')
+    assert 'RuntimeError: boom' in parsed['m']
+
+
+def main():
+    """主测试函数"""
+    print("同步逻辑测试")
+    print("=" * 50)
+
+    tests = [
+        test_error_info_dict_access,
+        test_retry_delay_bounds,
+        test_classify_sync_status_matches_row_rule,
+        test_trading_calendar_bitmap,
+        test_fast_json_formatter_escaping,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"通过 {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,16 +1,30 @@
-import akshare as ak
+import argparse
 import time
 
-print('测试获取股票300251的数据...')
-start_time = time.time()
+import akshare as ak
+
+
+def fetch_stock_hist(symbol, start_date, end_date):
+    print(f'测试获取股票{symbol}的数据...')
+    start_time = time.time()
+
+    try:
+        df = ak.stock_zh_a_hist(symbol=symbol, period='daily', start_date=start_date, end_date=end_date, adjust='')
+        end_time = time.time()
+        print(f'成功获取数据，耗时: {end_time - start_time:.2f}秒')
+        print(f'数据行数: {len(df)}')
+        print(df.head())
+    except Exception as e:
+        end_time = time.time()
+        print(f'获取数据失败，耗时: {end_time - start_time:.2f}秒')
+        print(f'错误: {e}')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='测试获取单只股票的历史数据')
+    parser.add_argument('--symbol', default='300251', help='股票代码 (默认: 300251)')
+    parser.add_argument('--start-date', default='20250101', help='开始日期 YYYYMMDD')
+    parser.add_argument('--end-date', default='20250721', help='结束日期 YYYYMMDD')
+    args = parser.parse_args()
 
-try:
-    df = ak.stock_zh_a_hist(symbol='300251', period='daily', start_date='20250101', end_date='20250721', adjust='')
-    end_time = time.time()
-    print(f'成功获取数据，耗时: {end_time - start_time:.2f}秒')
-    print(f'数据行数: {len(df)}')
-    print(df.head())
-except Exception as e:
-    end_time = time.time()
-    print(f'获取数据失败，耗时: {end_time - start_time:.2f}秒')
-    print(f'错误: {e}')
\ No newline at end of file
+    fetch_stock_hist(args.symbol, args.start_date, args.end_date)
@@ -7,12 +7,109 @@ import mysql.connector
 import sys
 import os
 import time
+import json
+import argparse
+import itertools
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database_config import DatabaseConfig
 import pandas as pd
 from datetime import datetime, date
 
-def check_sync_status():
+# 股票信息快照缓存（stock_stock_info 每天最多变化一次）
+CACHE_DIR = os.path.join('logs', '.cache')
+STOCK_INFO_CACHE = os.path.join(CACHE_DIR, 'stock_info.parquet')
+STOCK_INFO_PROBE = os.path.join(CACHE_DIR, 'stock_info.probe.json')
+STOCK_INFO_LOCK = os.path.join(CACHE_DIR, 'stock_info.lock')
+CACHE_TTL_SECONDS = 6 * 3600
+# 锁文件超过该时长视为持有进程已异常退出
+STOCK_INFO_LOCK_TIMEOUT = 300
+
+def _probe_stock_info(cursor):
+    """快速探测股票信息表是否变化（主键索引即可满足，不扫描整表数据）"""
+    cursor.execute("""
+        SELECT COUNT(*), MAX(A股代码), MAX(A股上市日期)
+        FROM stock_stock_info
+    """)
+    return [str(value) for value in cursor.fetchone()]
+
+def _load_cached_stock_info(probe):
+    """读取本地缓存，缓存过期或探测值不一致时返回None"""
+    try:
+        if time.time() - os.path.getmtime(STOCK_INFO_CACHE) >= CACHE_TTL_SECONDS:
+            return None
+        with open(STOCK_INFO_PROBE, 'r', encoding='utf-8') as f:
+            if json.load(f) != probe:
+                return None
+        df = pd.read_parquet(STOCK_INFO_CACHE, engine="pyarrow")
+        return list(df.itertuples(index=False, name=None))
+    except (OSError, ValueError, ImportError):
+        return None
+
+def _acquire_cache_lock():
+    """创建锁文件，返回文件描述符；其他进程持有时返回None
+
+    超过 STOCK_INFO_LOCK_TIMEOUT 的锁文件是异常退出的进程遗留的，删除后重试一次。
+    """
+    for _ in range(2):
+        try:
+            return os.open(STOCK_INFO_LOCK, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(STOCK_INFO_LOCK) < STOCK_INFO_LOCK_TIMEOUT:
+                    return None
+                os.remove(STOCK_INFO_LOCK)
+            except OSError:
+                return None
+        except OSError:
+            return None
+    return None
+
+def _save_stock_info_cache(all_stocks, probe):
+    """写入本地缓存，用锁文件避免并行进程同时写入"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError:
+        return
+    lock_fd = _acquire_cache_lock()
+    if lock_fd is None:
+        # 其他进程正在刷新缓存，本次跳过
+        return
+    
+    try:
+        df = pd.DataFrame(all_stocks, columns=['A股代码', 'A股简称', 'A股上市日期'])
+        tmp_path = STOCK_INFO_CACHE + '.tmp'
+        df.to_parquet(tmp_path, compression="zstd", row_group_size=50000)
+        os.replace(tmp_path, STOCK_INFO_CACHE)
+        with open(STOCK_INFO_PROBE, 'w', encoding='utf-8') as f:
+            json.dump(probe, f)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"⚠️  写入股票信息缓存失败: {e}")
+    finally:
+        os.close(lock_fd)
+        os.remove(STOCK_INFO_LOCK)
+
+def fetch_stock_info(cursor, use_cache=True):
+    """获取股票信息表数据，优先使用本地Parquet缓存"""
+    probe = None
+    if use_cache:
+        probe = _probe_stock_info(cursor)
+        cached = _load_cached_stock_info(probe)
+        if cached is not None:
+            print("  使用本地缓存: " + STOCK_INFO_CACHE)
+            return cached
+    
+    cursor.execute("""
+        SELECT A股代码, A股简称, A股上市日期 
+        FROM stock_stock_info 
+        ORDER BY A股代码
+    """)
+    all_stocks = cursor.fetchall()
+    
+    if use_cache:
+        _save_stock_info_cache(all_stocks, probe)
+    return all_stocks
+
+def check_sync_status(use_cache=True):
     """检查同步状态"""
     start_time = time.time()
     db_config = DatabaseConfig()
@@ -27,7 +124,8 @@ def check_sync_status():
             autocommit=True,
             buffered=True,  # 启用缓冲，提高查询性能
             use_unicode=True,
-            charset='utf8mb4'
+            charset='utf8mb4',
+            use_pure=False  # 使用C扩展解析结果集，大结果集fetchall更快
         )
         
         cursor = conn.cursor()
@@ -37,13 +135,7 @@ def check_sync_status():
         
         # 1. 获取所有股票信息
         print("📊 获取股票信息表数据...")
-        cursor.execute("""
-            SELECT A股代码, A股简称, A股上市日期 
-            FROM stock_stock_info 
-            ORDER BY A股代码
-        """)
-        
-        all_stocks = cursor.fetchall()
+        all_stocks = fetch_stock_info(cursor, use_cache=use_cache)
         total_stocks = len(all_stocks)
         
         print(f"📈 股票信息表总数: {total_stocks} 只股票")
@@ -184,24 +276,30 @@ def check_sync_status():
             print(f"\n📊 数据质量分析:")
             print("-" * 60)
             
-            # 计算平均记录数
-            avg_records = sum(s['record_count'] for s in synced_stocks) / len(synced_stocks)
-            print(f"  平均历史记录数: {avg_records:.0f} 条/股票")
+            # 一次遍历同时计算平均值、最多/最少记录数和数据时间范围
+            record_sum = 0
+            max_stock = min_stock = synced_stocks[0]
+            overall_earliest = overall_latest = None
+            for s in synced_stocks:
+                record_count = s['record_count']
+                record_sum += record_count
+                if record_count > max_stock['record_count']:
+                    max_stock = s
+                if record_count < min_stock['record_count']:
+                    min_stock = s
+                if s['earliest_date'] and (overall_earliest is None or s['earliest_date'] < overall_earliest):
+                    overall_earliest = s['earliest_date']
+                if s['latest_date'] and (overall_latest is None or s['latest_date'] > overall_latest):
+                    overall_latest = s['latest_date']
             
-            # 找出记录数最多和最少的股票
-            max_stock = max(synced_stocks, key=lambda x: x['record_count'])
-            min_stock = min(synced_stocks, key=lambda x: x['record_count'])
+            avg_records = record_sum / len(synced_stocks)
+            print(f"  平均历史记录数: {avg_records:.0f} 条/股票")
             
             print(f"  记录数最多: {max_stock['code']} ({max_stock['name']}) - {max_stock['record_count']:,} 条")
             print(f"  记录数最少: {min_stock['code']} ({min_stock['name']}) - {min_stock['record_count']:,} 条")
             
             # 数据时间范围
-            earliest_dates = [s['earliest_date'] for s in synced_stocks if s['earliest_date']]
-            latest_dates = [s['latest_date'] for s in synced_stocks if s['latest_date']]
-            
-            if earliest_dates and latest_dates:
-                overall_earliest = min(earliest_dates)
-                overall_latest = max(latest_dates)
+            if overall_earliest and overall_latest:
                 print(f"  数据时间范围: {overall_earliest} 至 {overall_latest}")
         
         # 8. 生成建议
@@ -300,28 +398,20 @@ def generate_sync_commands(unsynced_stocks):
     print(f"\n🚀 生成同步命令:")
     print("-" * 60)
     
-    # 按代码段分组
-    segments = {}
-    for stock in unsynced_stocks:
-        segment = stock['code'][:3]
-        if segment not in segments:
-            segments[segment] = []
-        segments[segment].append(stock)
-    
-    for segment in sorted(segments.keys()):
-        stocks = segments[segment]
-        if len(stocks) == 1:
-            stock = stocks[0]
-            print(f"# 同步 {segment}xxx 系列 (1只)")
-            print(f"python core/smart_stock_sync.py continue {stock['code']}")
-        else:
-            first_stock = min(stocks, key=lambda x: x['code'])
-            print(f"# 同步 {segment}xxx 系列 ({len(stocks)}只)")
-            print(f"python core/smart_stock_sync.py continue {first_stock['code']}")
+    # 按代码排序后按代码段分组，每组第一只即为代码最小的股票
+    sorted_stocks = sorted(unsynced_stocks, key=lambda s: s['code'])
+    for segment, group in itertools.groupby(sorted_stocks, key=lambda s: s['code'][:3]):
+        stocks = list(group)
+        print(f"# 同步 {segment}xxx 系列 ({len(stocks)}只)")
+        print(f"python core/smart_stock_sync.py continue {stocks[0]['code']}")
         print()
 
 if __name__ == "__main__":
-    result = check_sync_status()
+    parser = argparse.ArgumentParser(description='检查股票数据同步状态')
+    parser.add_argument('--no-cache', action='store_true', help='不使用股票信息本地缓存')
+    args = parser.parse_args()
+    
+    result = check_sync_status(use_cache=not args.no_cache)
     
     if result and result['unsynced_count'] > 0:
         print(f"\n" + "=" * 80)
@@ -31,14 +31,19 @@ def check_tables():
             print(f"  {table[0]}")
         
         # 检查股票数据表
-        stock_data_tables = [table[0] for table in tables if 'stock' in table[0].lower() and 'data' in table[0].lower()]
+        # 一次性从 INFORMATION_SCHEMA 读取所有候选表的行数，避免逐表 COUNT(*) 全索引扫描。
+        # 注意: InnoDB 的 TABLE_ROWS 是估算值，对诊断用途足够；需要精确值时请对单表执行 COUNT(*)
+        cursor.execute("""
+            SELECT TABLE_NAME, TABLE_ROWS
+            FROM INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME LIKE %s
+        """, (db_config.database, '%stock%data%'))
+        stock_data_tables = cursor.fetchall()
         
         if stock_data_tables:
             print(f"\n可能的股票数据表:")
-            for table in stock_data_tables:
-                cursor.execute(f"SELECT COUNT(*) FROM {table}")
-                count = cursor.fetchone()[0]
-                print(f"  {table}: {count} 条记录")
+            for table, approx_rows in stock_data_tables:
+                print(f"  {table}: 约 {approx_rows or 0} 条记录")
                 
                 # 查看表结构
                 cursor.execute(f"DESCRIBE {table}")
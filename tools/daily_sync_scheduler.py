@@ -6,11 +6,14 @@
 import schedule
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, util as mp_util
 import os
 import logging
+from contextlib import closing
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional
-import mysql.connector
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database_config import DatabaseConfig
@@ -47,24 +50,58 @@ class TradingCalendar:
             date(2025, 9, 29),  # 国庆节调休
             date(2025, 10, 11), # 国庆节调休
         ]
+        
+        self._holiday_set = frozenset(self.holidays_2025)
+        self._makeup_set = frozenset(self.makeup_workdays_2025)
+        
+        # 预先计算全年的交易日位图，按日期序数索引
+        self._base = date(2025, 1, 1).toordinal()
+        self._bitmap = bytes(
+            self._compute_is_trading_day(date.fromordinal(o))
+            for o in range(self._base, date(2026, 1, 1).toordinal())
+        )
+        
+        # 缓存按日期的查询结果，调度器运行期间重复查询直接复用
+        self._fallback_is_trading_day = lru_cache(maxsize=4096)(self._compute_is_trading_day)
+        self._last_trading_day = lru_cache(maxsize=1024)(self._compute_last_trading_day)
+        self._next_trading_day = lru_cache(maxsize=1024)(self._compute_next_trading_day)
     
-    def is_trading_day(self, check_date: date) -> bool:
-        """判断是否为交易日"""
+    def clear_cache(self):
+        """清空日期查询缓存（由调度器每晚调用，避免缓存长期保留历史日期）"""
+        self._fallback_is_trading_day.cache_clear()
+        self._last_trading_day.cache_clear()
+        self._next_trading_day.cache_clear()
+    
+    def _compute_is_trading_day(self, check_date: date) -> bool:
+        """根据节假日和调休表计算是否为交易日"""
         # 检查是否为节假日
-        if check_date in self.holidays_2025:
+        if check_date in self._holiday_set:
             return False
         
         # 检查是否为周末（但排除调休工作日）
         if check_date.weekday() >= 5:  # 周六=5, 周日=6
-            return check_date in self.makeup_workdays_2025
+            return check_date in self._makeup_set
         
         return True
     
+    def is_trading_day(self, check_date: date) -> bool:
+        """判断是否为交易日"""
+        offset = check_date.toordinal() - self._base
+        if 0 <= offset < len(self._bitmap):
+            return bool(self._bitmap[offset])
+        
+        # 位图范围外的日期按规则计算
+        return self._fallback_is_trading_day(check_date)
+    
     def get_last_trading_day(self, from_date: Optional[date] = None) -> date:
         """获取最近的交易日"""
         if from_date is None:
             from_date = date.today()
         
+        return self._last_trading_day(from_date)
+    
+    def _compute_last_trading_day(self, from_date: date) -> date:
+        """向前查找最近的交易日"""
         check_date = from_date - timedelta(days=1)
         
         # 向前查找最近的交易日（最多查找10天）
@@ -81,6 +118,10 @@ class TradingCalendar:
         if from_date is None:
             from_date = date.today()
         
+        return self._next_trading_day(from_date)
+    
+    def _compute_next_trading_day(self, from_date: date) -> date:
+        """向后查找下一个交易日"""
         check_date = from_date + timedelta(days=1)
         
         # 向后查找下一个交易日（最多查找10天）
@@ -92,9 +133,33 @@ class TradingCalendar:
         # 如果10天内都没有交易日，返回一周后（保险起见）
         return from_date + timedelta(days=7)
 
+def _worker_init():
+    """进程池初始化：禁用代理，并在工作进程正常退出时关闭其线程同步器的数据库连接
+    
+    工作进程以 os._exit 退出，atexit 不会执行，因此用 multiprocessing 的 Finalize 注册。
+    """
+    from core.batch_sync_stocks import disable_proxy_for_process
+    from core.smart_stock_sync import close_thread_syncers
+    disable_proxy_for_process()
+    mp_util.Finalize(None, close_thread_syncers, exitpriority=10)
+
+def _worker(stock: Dict) -> bool:
+    """进程池工作函数：在常驻工作进程内增量同步单只股票
+    
+    同步模块只在每个工作进程首次调用时导入一次，数据库连接也在进程内复用。
+    """
+    from core.smart_stock_sync import sync_stock_chunk
+    return sync_stock_chunk([stock])[0]
+
 class DailySyncScheduler:
     """每日同步调度器"""
     
+    # 每批同步的股票数量及同时进行同步的批次数（线程数）
+    chunk_size = 50
+    max_workers = 8
+    # 为True时使用常驻工作进程池代替线程池，进程间相互隔离
+    use_processes = False
+    
     def __init__(self):
         self.db_config = DatabaseConfig()
         self.calendar = TradingCalendar()
@@ -112,112 +177,89 @@ class DailySyncScheduler:
         )
         self.logger = logging.getLogger(__name__)
     
-    def check_database_connection(self) -> bool:
-        """检查数据库连接"""
+    def get_stocks_need_update(self) -> Optional[List[Dict]]:
+        """获取需要更新的股票列表，数据库不可用时返回None"""
         try:
-            conn = mysql.connector.connect(
-                host=self.db_config.host,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database,
-                connection_timeout=10
-            )
-            conn.close()
-            return True
-        except Exception as e:
-            self.logger.error(f"数据库连接失败: {e}")
-            return False
-    
-    def get_stocks_need_update(self) -> List[Dict]:
-        """获取需要更新的股票列表"""
-        try:
-            conn = mysql.connector.connect(
-                host=self.db_config.host,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database,
-                buffered=True
-            )
-            cursor = conn.cursor()
-            
-            # 获取所有股票的最新数据日期
-            cursor.execute("""
-                SELECT si.A股代码, si.A股简称, 
-                       COALESCE(MAX(sh.日期), '1990-01-01') as latest_date,
-                       COUNT(sh.日期) as record_count
-                FROM stock_stock_info si
-                LEFT JOIN stock_stock_zh_a_hist sh ON si.A股代码 = sh.股票代码
-                GROUP BY si.A股代码, si.A股简称
-                ORDER BY si.A股代码
-            """)
-            
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            # 分析哪些股票需要更新
-            last_trading_day = self.calendar.get_last_trading_day()
-            needs_update = []
-            
-            for stock_code, stock_name, latest_date, record_count in results:
-                # 转换日期格式
-                if isinstance(latest_date, str):
-                    latest_date = datetime.strptime(latest_date, '%Y-%m-%d').date()
+            with closing(self.db_config.get_mysql_pool().get_connection()) as conn, \
+                    closing(conn.cursor(buffered=True)) as cursor:
+                # 在数据库端筛选落后于最近交易日的股票，并按落后天数降序返回
+                last_trading_day = self.calendar.get_last_trading_day()
+                cursor.execute("""
+                    SELECT si.A股代码, si.A股简称, 
+                           CAST(COALESCE(MAX(sh.日期), '1990-01-01') AS DATE) as latest_date,
+                           DATEDIFF(%s, COALESCE(MAX(sh.日期), '1990-01-01')) as days_behind,
+                           COUNT(sh.日期) as record_count
+                    FROM stock_stock_info si
+                    LEFT JOIN stock_stock_zh_a_hist sh ON si.A股代码 = sh.股票代码
+                    GROUP BY si.A股代码, si.A股简称
+                    HAVING latest_date < %s
+                    ORDER BY days_behind DESC
+                """, (last_trading_day, last_trading_day))
                 
-                # 判断是否需要更新
-                if latest_date < last_trading_day:
-                    days_behind = (last_trading_day - latest_date).days
-                    needs_update.append({
+                return [
+                    {
                         'code': stock_code,
                         'name': stock_name,
                         'latest_date': latest_date,
                         'days_behind': days_behind,
                         'record_count': record_count
-                    })
-            
-            return needs_update
+                    }
+                    for stock_code, stock_name, latest_date, days_behind, record_count in cursor.fetchall()
+                ]
             
         except Exception as e:
             self.logger.error(f"获取需要更新的股票列表失败: {e}")
-            return []
+            return None
     
-    def sync_stock_data(self, stock_code: str, stock_name: str) -> bool:
-        """同步单只股票数据"""
+    def _sync_chunk(self, chunk: List[Dict], chunk_no: int, chunk_total: int) -> List[bool]:
+        """在线程池中增量同步一批股票"""
+        # 延迟导入，避免同步模块的日志配置覆盖调度器日志
+        from core.smart_stock_sync import sync_stock_chunk
+        
+        self.logger.info(f"[批次 {chunk_no}/{chunk_total}] 同步 {len(chunk)} 只股票 ({chunk[0]['code']} - {chunk[-1]['code']})")
         try:
-            import subprocess
-            
-            # 调用现有的同步脚本
-            cmd = [
-                sys.executable, 
-                'core/smart_stock_sync.py', 
-                'continue', 
-                stock_code
-            ]
-            
-            self.logger.info(f"开始同步 {stock_code} ({stock_name})")
-            
-            # 执行同步命令
-            result = subprocess.run(
-                cmd, 
-                capture_output=True, 
-                text=True, 
-                timeout=300,  # 5分钟超时
-                input='y\n'  # 自动确认
-            )
-            
-            if result.returncode == 0:
-                self.logger.info(f"成功同步 {stock_code} ({stock_name})")
-                return True
-            else:
-                self.logger.error(f"同步失败 {stock_code} ({stock_name}): {result.stderr}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            self.logger.error(f"同步超时 {stock_code} ({stock_name})")
-            return False
+            results = sync_stock_chunk(chunk)
         except Exception as e:
-            self.logger.error(f"同步异常 {stock_code} ({stock_name}): {e}")
-            return False
+            self.logger.error(f"[批次 {chunk_no}/{chunk_total}] 同步异常: {e}")
+            return [False] * len(chunk)
+        
+        for stock, ok in zip(chunk, results):
+            if not ok:
+                self.logger.error(f"同步失败 {stock['code']} ({stock['name']})")
+        self.logger.info(f"[批次 {chunk_no}/{chunk_total}] 完成，成功 {sum(results)}/{len(chunk)} 只")
+        return results
+    
+    def _sync_stocks_concurrently(self, stocks_to_update: List[Dict]) -> List[bool]:
+        """按批次并发同步股票列表，线程池大小限制同时进行的同步数量"""
+        chunks = [stocks_to_update[i:i + self.chunk_size]
+                  for i in range(0, len(stocks_to_update), self.chunk_size)]
+        
+        from core.batch_sync_stocks import disable_proxy_for_process
+        from core.smart_stock_sync import close_thread_syncers
+        
+        # 代理设置是进程级的，在启动工作线程前统一禁用一次
+        disable_proxy_for_process()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                chunk_results = list(executor.map(
+                    self._sync_chunk, chunks, range(1, len(chunks) + 1), [len(chunks)] * len(chunks)
+                ))
+        finally:
+            close_thread_syncers()
+        
+        return [ok for results in chunk_results for ok in results]
+    
+    def _sync_stocks_in_processes(self, stocks_to_update: List[Dict]) -> List[bool]:
+        """使用常驻工作进程池同步股票列表，避免每只股票启动一个解释器"""
+        results = []
+        with Pool(processes=self.max_workers, initializer=_worker_init) as pool:
+            for i, ok in enumerate(pool.imap_unordered(_worker, stocks_to_update, chunksize=4), 1):
+                results.append(ok)
+                if i % self.chunk_size == 0:
+                    self.logger.info(f"进度: {i}/{len(stocks_to_update)}，成功 {sum(results)} 只")
+            pool.close()
+            pool.join()
+        return results
     
     def run_daily_sync(self):
         """执行每日同步任务"""
@@ -232,39 +274,27 @@ class DailySyncScheduler:
             self.logger.info("今天不是交易日，跳过同步")
             return
         
-        # 检查数据库连接
-        if not self.check_database_connection():
-            self.logger.error("数据库连接失败，终止同步任务")
-            return
-        
-        # 获取需要更新的股票
+        # 获取需要更新的股票（首次取池化连接即可发现数据库不可用，无需单独探测）
         stocks_to_update = self.get_stocks_need_update()
         
+        if stocks_to_update is None:
+            self.logger.error("数据库查询失败，终止同步任务")
+            return
+        
         if not stocks_to_update:
             self.logger.info("所有股票数据都是最新的，无需同步")
             return
         
         self.logger.info(f"发现 {len(stocks_to_update)} 只股票需要更新")
         
-        # 按落后天数排序，优先同步落后较多的股票
-        stocks_to_update.sort(key=lambda x: x['days_behind'], reverse=True)
-        
-        # 执行同步
-        success_count = 0
-        failed_count = 0
-        
-        for i, stock in enumerate(stocks_to_update, 1):
-            self.logger.info(f"[{i}/{len(stocks_to_update)}] 同步 {stock['code']} ({stock['name']}) - 落后 {stock['days_behind']} 天")
-            
-            if self.sync_stock_data(stock['code'], stock['name']):
-                success_count += 1
-            else:
-                failed_count += 1
-            
-            # 每同步10只股票休息一下，避免过于频繁的请求
-            if i % 10 == 0:
-                self.logger.info("休息5秒...")
-                time.sleep(5)
+        # 执行同步：查询结果已按落后天数降序排列，优先同步落后较多的股票；
+        # 并发数由线程池大小限制，避免过于频繁的请求
+        if self.use_processes:
+            results = self._sync_stocks_in_processes(stocks_to_update)
+        else:
+            results = self._sync_stocks_concurrently(stocks_to_update)
+        success_count = sum(results)
+        failed_count = len(results) - success_count
         
         # 同步结果统计
         self.logger.info("=" * 60)
@@ -315,16 +345,25 @@ class DailySyncScheduler:
         # 周末也检查一次（防止遗漏）
         schedule.every().saturday.at("10:00").do(self.run_daily_sync)
         
+        # 每晚清理交易日历缓存
+        schedule.every().day.at("00:05").do(self.calendar.clear_cache)
+        
         self.logger.info("定时任务已设置:")
         self.logger.info("- 工作日 09:00 (开盘前同步)")
         self.logger.info("- 工作日 18:00 (收盘后同步)")
         self.logger.info("- 周六 10:00 (补充检查)")
         
-        # 运行调度器
+        # 运行调度器：直接休眠到下一个任务的执行时间，而不是每分钟轮询
         while True:
             try:
                 schedule.run_pending()
-                time.sleep(60)  # 每分钟检查一次
+                delay = schedule.idle_seconds()
+                if delay is None:
+                    self.logger.info("没有待执行的定时任务，退出调度器")
+                    break
+                if delay > 0:
+                    # 单次最多休眠1小时，避免系统休眠/时钟调整后错过任务
+                    time.sleep(min(delay, 3600))
             except KeyboardInterrupt:
                 self.logger.info("收到停止信号，退出调度器")
                 break
@@ -338,10 +377,12 @@ def main():
     parser = argparse.ArgumentParser(description='每日股票数据同步调度器')
     parser.add_argument('--run-once', action='store_true', help='立即执行一次同步任务')
     parser.add_argument('--check-calendar', action='store_true', help='检查交易日历')
+    parser.add_argument('--processes', action='store_true', help='使用多进程工作池执行同步')
     
     args = parser.parse_args()
     
     scheduler = DailySyncScheduler()
+    scheduler.use_processes = args.processes
     
     if args.check_calendar:
         # 检查交易日历
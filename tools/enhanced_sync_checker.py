@@ -3,12 +3,15 @@
 增强版股票数据同步状态检查工具
 包含索引检查、数据一致性验证、批量同步命令生成等功能
 """
-import mysql.connector
 import sys
 import os
 import time
+import random
 import argparse
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import pandas as pd
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database_config import DatabaseConfig
 from datetime import datetime, date, timedelta
@@ -18,49 +21,43 @@ class EnhancedSyncChecker:
         self.db_config = DatabaseConfig()
         self.conn = None
         self.cursor = None
+        self._refresh_check_dates()
+    
+    def _refresh_check_dates(self):
+        """计算本次检查使用的日期阈值，每次 run_full_check 开始时刷新"""
+        self._today = date.today()
+        self._recent_threshold = self._today - timedelta(days=10)  # 10天内有更新就算正常
+        self._list_cutoff = timedelta(days=90)  # 上市不到3个月视为新股
+        self._early_gap = timedelta(days=60)  # 最早数据晚于上市日期60天视为缺少早期数据
         
     def connect_db(self):
-        """连接数据库"""
+        """从共享连接池获取数据库连接"""
         try:
-            self.conn = mysql.connector.connect(
-                host=self.db_config.host,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database,
-                autocommit=True,
-                buffered=True,
-                use_unicode=True,
-                charset='utf8mb4'
-            )
-            self.cursor = self.conn.cursor()
+            self.conn = self.db_config.get_mysql_pool().get_connection()
+            self.cursor = self.conn.cursor(buffered=True)
             return True
         except Exception as e:
             print(f"❌ 数据库连接失败: {e}")
             return False
     
     def close_db(self):
-        """关闭数据库连接"""
+        """关闭游标并将连接归还到连接池"""
         if self.cursor:
             self.cursor.close()
         if self.conn:
             self.conn.close()
     
     def is_stock_fully_synced(self, stock_code, stock_name, list_date, record_count, earliest_date, latest_date):
-        """智能判断股票是否完全同步"""
-        today = date.today()
-        recent_threshold = today - timedelta(days=10)  # 10天内有更新就算正常
-        
+        """智能判断股票是否完全同步（逐行判断，作为 classify_sync_status 的非向量化备用实现）"""
         # 检查1: 完全没有数据
         if record_count == 0:
             return False
         
         # 检查2: 对于新上市股票（上市不到3个月），记录数过少才需要同步
         if list_date and isinstance(list_date, date):
-            days_since_listing = (today - list_date).days
-            
-            if days_since_listing <= 90:  # 上市不到3个月的新股
+            if self._today - list_date <= self._list_cutoff:  # 上市不到3个月的新股
                 # 新股的合理记录数应该大约是交易天数（约每月20个交易日）
-                expected_records = max(10, days_since_listing * 0.7)  # 考虑周末和节假日
+                expected_records = max(10, (self._today - list_date).days * 0.7)  # 考虑周末和节假日
                 if record_count < expected_records * 0.5:  # 少于预期的一半才认为需要同步
                     return False
             else:
@@ -69,49 +66,85 @@ class EnhancedSyncChecker:
                     return False
                 
                 # 检查是否缺少早期数据
-                if earliest_date > list_date + timedelta(days=60):
+                if earliest_date > list_date + self._early_gap:
                     return False
         
         # 检查3: 数据时效性（只对有足够历史数据的股票检查）
         if record_count >= 100:
-            if latest_date < recent_threshold:
+            if latest_date < self._recent_threshold:
                 return False
         
         return True
     
+    def classify_sync_status(self, merged):
+        """按 is_stock_fully_synced 的规则批量判断同步状态
+        
+        merged 为股票信息与历史数据统计左连接后的 DataFrame，
+        返回 (是否完全同步, 是否有历史数据) 两个布尔 Series。
+        """
+        today = pd.Timestamp(self._today)
+        recent_threshold = pd.Timestamp(self._recent_threshold)
+        
+        record_count = merged['record_count']
+        # 与逐行判断一致：只有 date 类型的上市日期参与新股/老股判断，字符串等其他值视为无上市日期
+        raw_list_date = merged['list_date']
+        is_date = raw_list_date.map(lambda value: isinstance(value, date)).astype(bool)
+        list_date = pd.to_datetime(raw_list_date.where(is_date), errors='coerce')
+        earliest_date = pd.to_datetime(merged['earliest_date'])
+        latest_date = pd.to_datetime(merged['latest_date'])
+        
+        days_since_listing = (today - list_date).dt.days
+        is_new_stock = list_date.notna() & (days_since_listing <= self._list_cutoff.days)
+        is_old_stock = list_date.notna() & (days_since_listing > self._list_cutoff.days)
+        expected_records = (days_since_listing * 0.7).clip(lower=10)
+        
+        needs_sync = (
+            # 完全没有数据
+            (record_count == 0)
+            # 上市不到3个月的新股：少于预期记录数的一半
+            | (is_new_stock & (record_count < expected_records * 0.5))
+            # 老股票：记录数过少或缺少早期数据
+            | (is_old_stock & ((record_count < 100)
+                               | (earliest_date > list_date + self._early_gap)))
+            # 数据时效性（只对有足够历史数据的股票检查）
+            | ((record_count >= 100) & (latest_date < recent_threshold))
+        )
+        
+        return ~needs_sync, record_count.notna()
+    
     def check_database_indexes(self):
         """检查数据库索引状态"""
         print("🔍 检查数据库索引状态...")
         print("-" * 60)
         
-        # 检查股票信息表索引
+        # 一次查询两张表的索引列
         self.cursor.execute("""
-            SHOW INDEX FROM stock_stock_info
-        """)
-        info_indexes = self.cursor.fetchall()
-        
-        # 检查历史数据表索引
-        self.cursor.execute("""
-            SHOW INDEX FROM stock_stock_zh_a_hist
-        """)
-        hist_indexes = self.cursor.fetchall()
-        
-        print("📊 stock_stock_info 表索引:")
-        for idx in info_indexes:
-            print(f"  - {idx[2]} ({idx[4]})")
-        
-        print("\n📊 stock_stock_zh_a_hist 表索引:")
-        for idx in hist_indexes:
-            print(f"  - {idx[2]} ({idx[4]})")
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME IN ('stock_stock_info', 'stock_stock_zh_a_hist')
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+        """, (self.db_config.database,))
+        
+        index_rows = self.cursor.fetchall()
+        idx_map = {(table_name, column_name): index_name
+                   for table_name, index_name, column_name in index_rows}
+        
+        for title, table in (("📊 stock_stock_info 表索引:", 'stock_stock_info'),
+                             ("\n📊 stock_stock_zh_a_hist 表索引:", 'stock_stock_zh_a_hist')):
+            print(title)
+            for table_name, index_name, column_name in index_rows:
+                if table_name == table:
+                    print(f"  - {index_name} ({column_name})")
         
         # 检查是否有推荐的索引
-        hist_code_indexed = any('股票代码' in str(idx[4]) for idx in hist_indexes)
-        hist_date_indexed = any('日期' in str(idx[4]) for idx in hist_indexes)
+        hist_code_indexed = ('stock_stock_zh_a_hist', '股票代码') in idx_map
+        hist_date_indexed = ('stock_stock_zh_a_hist', '日期') in idx_map
         
         print(f"\n💡 索引建议:")
         if not hist_code_indexed:
             print("  ⚠️  建议在 stock_stock_zh_a_hist.股票代码 上创建索引")
-            print("     CREATE INDEX idx_stock_code ON stock_stock_zh_a_hist(股票代码);")
+            print("     CREATE INDEX idx_stock_date ON stock_stock_zh_a_hist(股票代码(10), 日期);")
         else:
             print("  ✅ 股票代码索引已存在")
             
@@ -121,71 +154,109 @@ class EnhancedSyncChecker:
         else:
             print("  ✅ 日期索引已存在")
     
-    def check_data_consistency(self):
-        """检查数据一致性"""
-        print("\n🔍 检查数据一致性...")
-        print("-" * 60)
-        
-        # 检查重复数据
-        self.cursor.execute("""
+    def _pool_query(self, sql, params=None):
+        """从连接池取一个短连接执行查询，返回全部结果"""
+        with closing(self.db_config.get_mysql_pool().get_connection()) as conn:
+            with closing(conn.cursor(buffered=True)) as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+    
+    def _q_has_unique_code_date(self):
+        # 存在 (股票代码, 日期) 唯一索引时，数据库已保证不会有重复数据
+        rows = self._pool_query("""
+            SELECT INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX)
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME = 'stock_stock_zh_a_hist'
+              AND NON_UNIQUE = 0
+            GROUP BY INDEX_NAME
+        """, (self.db_config.database,))
+        return any(columns == '股票代码,日期' for _, columns in rows)
+    
+    def _q_duplicates(self):
+        return self._pool_query("""
             SELECT 股票代码, 日期, COUNT(*) as cnt
             FROM stock_stock_zh_a_hist
             GROUP BY 股票代码, 日期
             HAVING COUNT(*) > 1
             LIMIT 10
         """)
-        
-        duplicates = self.cursor.fetchall()
-        if duplicates:
-            print(f"⚠️  发现重复数据 ({len(duplicates)} 组):")
-            for dup in duplicates[:5]:
-                print(f"  - {dup[0]} {dup[1]}: {dup[2]} 条重复记录")
-            if len(duplicates) > 5:
-                print(f"  ... 还有 {len(duplicates) - 5} 组重复数据")
-        else:
-            print("✅ 未发现重复数据")
-        
-        # 检查数据完整性（价格为0或负数的异常数据）
-        self.cursor.execute("""
+    
+    def _q_invalid_price(self):
+        return self._pool_query("""
             SELECT COUNT(*) as cnt
             FROM stock_stock_zh_a_hist
             WHERE 开盘 <= 0 OR 收盘 <= 0 OR 最高 <= 0 OR 最低 <= 0
-        """)
-        
-        invalid_price = self.cursor.fetchone()[0]
-        if invalid_price > 0:
-            print(f"⚠️  发现异常价格数据: {invalid_price:,} 条记录")
-        else:
-            print("✅ 价格数据正常")
-        
-        # 检查日期连续性（抽样检查几只股票）
-        self.cursor.execute("""
-            SELECT 股票代码 FROM stock_stock_zh_a_hist 
-            GROUP BY 股票代码 
-            HAVING COUNT(*) > 1000 
-            ORDER BY RAND() 
-            LIMIT 3
-        """)
-        
-        sample_stocks = [row[0] for row in self.cursor.fetchall()]
+        """)[0][0]
+    
+    def _q_sample_stocks(self, sample_candidates=None):
+        # 在Python端随机抽样，避免 ORDER BY RAND() 排序
+        if sample_candidates is None:
+            rows = self._pool_query("""
+                SELECT 股票代码 FROM stock_stock_zh_a_hist 
+                GROUP BY 股票代码 
+                HAVING COUNT(*) > 1000
+            """)
+            sample_candidates = [row[0] for row in rows]
+        return random.sample(sample_candidates, min(3, len(sample_candidates)))
+    
+    def _q_gaps(self, stock_code):
+        # 在数据库端计算相邻日期间隔，只返回超过7天的间隔（可能是异常）
+        rows = self._pool_query("""
+            SELECT gap FROM (
+                SELECT DATEDIFF(日期, LAG(日期) OVER (ORDER BY 日期)) AS gap
+                FROM stock_stock_zh_a_hist 
+                WHERE 股票代码 = %s
+            ) t
+            WHERE gap > 7
+        """, (stock_code,))
+        return [row[0] for row in rows]
+    
+    def check_data_consistency(self, sample_candidates=None, deep=False):
+        """检查数据一致性
+        
+        sample_candidates 为记录数超过1000条的股票代码列表，用于日期连续性抽样；
+        为None时从数据库查询。各项检查并发执行，每个查询使用独立的池化连接。
+        重复数据检查需要聚合整张历史表：存在 uk_code_date 唯一索引时跳过，
+        否则仅在 deep=True 时执行。
+        """
+        print("\n🔍 检查数据一致性...")
+        print("-" * 60)
         
-        print(f"\n📅 日期连续性检查 (抽样 {len(sample_stocks)} 只股票):")
-        for stock_code in sample_stocks:
-            self.cursor.execute("""
-                SELECT 日期 FROM stock_stock_zh_a_hist 
-                WHERE 股票代码 = %s 
-                ORDER BY 日期
-            """, (stock_code,))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            has_unique_key = self._q_has_unique_code_date()
+            fut_dup = executor.submit(self._q_duplicates) if deep and not has_unique_key else None
+            fut_price = executor.submit(self._q_invalid_price)
+            fut_sample = executor.submit(self._q_sample_stocks, sample_candidates)
+            sample_stocks = fut_sample.result()
+            fut_gaps = [executor.submit(self._q_gaps, code) for code in sample_stocks]
             
-            dates = [row[0] for row in self.cursor.fetchall()]
-            if len(dates) > 1:
-                # 计算日期间隔
-                gaps = []
-                for i in range(1, len(dates)):
-                    gap = (dates[i] - dates[i-1]).days
-                    if gap > 7:  # 超过7天的间隔可能是异常
-                        gaps.append(gap)
-                
+            # 检查重复数据
+            duplicates = fut_dup.result() if fut_dup else None
+            if has_unique_key:
+                print("✅ 已存在 (股票代码, 日期) 唯一索引，无重复数据")
+            elif fut_dup is None:
+                print("⏭️  跳过重复数据检查（使用 --deep 执行，或运行 optimize_database.py 添加唯一索引）")
+            elif duplicates:
+                print(f"⚠️  发现重复数据 ({len(duplicates)} 组):")
+                for dup in duplicates[:5]:
+                    print(f"  - {dup[0]} {dup[1]}: {dup[2]} 条重复记录")
+                if len(duplicates) > 5:
+                    print(f"  ... 还有 {len(duplicates) - 5} 组重复数据")
+            else:
+                print("✅ 未发现重复数据")
+            
+            # 检查数据完整性（价格为0或负数的异常数据）
+            invalid_price = fut_price.result()
+            if invalid_price > 0:
+                print(f"⚠️  发现异常价格数据: {invalid_price:,} 条记录")
+            else:
+                print("✅ 价格数据正常")
+            
+            # 检查日期连续性（抽样检查几只股票）
+            print(f"\n📅 日期连续性检查 (抽样 {len(sample_stocks)} 只股票):")
+            for stock_code, fut in zip(sample_stocks, fut_gaps):
+                gaps = fut.result()
                 if gaps:
                     avg_gap = sum(gaps) / len(gaps)
                     print(f"  {stock_code}: 发现 {len(gaps)} 个较大日期间隔，平均 {avg_gap:.1f} 天")
@@ -198,27 +269,20 @@ class EnhancedSyncChecker:
         print("-" * 60)
         
         # 按上市年份分析
-        year_stats = defaultdict(lambda: {'total': 0, 'synced': 0, 'partial': 0, 'unsynced': 0})
-        
-        all_stocks_data = []
-        for stock in synced_stocks:
-            all_stocks_data.append(('synced', stock))
-        for stock in partial_synced:
-            all_stocks_data.append(('partial', stock))
-        for stock in unsynced_stocks:
-            all_stocks_data.append(('unsynced', stock))
-        
-        for status, stock in all_stocks_data:
-            if 'list_date' in stock and stock['list_date']:
-                year = stock['list_date'].year if hasattr(stock['list_date'], 'year') else int(str(stock['list_date'])[:4])
-                year_stats[year]['total'] += 1
-                year_stats[year][status] += 1
+        year_stats = defaultdict(Counter)
+        for status, stocks in (('synced', synced_stocks), ('partial', partial_synced), ('unsynced', unsynced_stocks)):
+            for stock in stocks:
+                list_date = stock.get('list_date')
+                if list_date:
+                    # 上市日期不一定是 date 类型（字符串等），此时取前4位作为年份
+                    year = list_date.year if hasattr(list_date, 'year') else int(str(list_date)[:4])
+                    year_stats[year][status] += 1
         
         print("📊 按上市年份统计:")
         recent_years = sorted([y for y in year_stats.keys() if y >= 2020], reverse=True)
         for year in recent_years[:10]:  # 显示最近10年
             stats = year_stats[year]
-            total = stats['total']
+            total = sum(stats.values())
             synced_rate = (stats['synced'] + stats['partial']) / total * 100 if total > 0 else 0
             status_icon = "✅" if synced_rate == 100 else "⚠️" if synced_rate >= 90 else "❌"
             print(f"  {status_icon} {year}年: {stats['synced']+stats['partial']:3d}/{total:3d} ({synced_rate:5.1f}%)")
@@ -246,38 +310,40 @@ class EnhancedSyncChecker:
         print(f"\n🚀 生成同步脚本:")
         print("-" * 60)
         
-        # 生成批量同步脚本
-        script_content = "#!/bin/bash\n"
-        script_content += "# 股票数据批量同步脚本\n"
-        script_content += f"# 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        # 生成批量同步脚本（逐行收集，避免字符串反复拼接）
+        parts = [
+            "#!/bin/bash\n",
+            "# 股票数据批量同步脚本\n",
+            f"# 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+        ]
         
         if unsynced_stocks:
-            script_content += "echo '开始同步未同步的股票...'\n"
+            parts.append("echo '开始同步未同步的股票...'\n")
             for stock in unsynced_stocks:
-                script_content += f"python core/smart_stock_sync.py continue {stock['code']}  # {stock['name']}\n"
-            script_content += "\n"
+                parts.append(f"python core/smart_stock_sync.py continue {stock['code']}  # {stock['name']}\n")
+            parts.append("\n")
         
         if partial_synced:
-            script_content += "echo '开始补充部分同步的股票数据...'\n"
+            parts.append("echo '开始补充部分同步的股票数据...'\n")
             # 优先同步记录数很少的股票
             sorted_partial = sorted(partial_synced, key=lambda x: x['record_count'])
             for stock in sorted_partial:
-                script_content += f"python core/smart_stock_sync.py continue {stock['code']}  # {stock['name']} ({stock['record_count']}条)\n"
+                parts.append(f"python core/smart_stock_sync.py continue {stock['code']}  # {stock['name']} ({stock['record_count']}条)\n")
         
-        script_content += "\necho '同步完成！'\n"
+        parts.append("\necho '同步完成！'\n")
         
         # 保存脚本文件
         with open('scripts/batch_sync.sh', 'w', encoding='utf-8') as f:
-            f.write(script_content)
+            f.writelines(parts)
         
-        # 生成Windows批处理文件
-        bat_content = script_content.replace('#!/bin/bash', '@echo off')
-        bat_content = bat_content.replace('echo ', 'echo ')
-        bat_content = bat_content.replace("echo '", 'echo ')
-        bat_content = bat_content.replace("'", '')
+        # 生成Windows批处理文件（逐行转换）
+        bat_parts = (
+            line.replace('#!/bin/bash', '@echo off').replace("echo '", 'echo ').replace("'", '')
+            for line in parts
+        )
         
         with open('scripts/batch_sync.bat', 'w', encoding='utf-8') as f:
-            f.write(bat_content)
+            f.writelines(bat_parts)
         
         print(f"✅ 批量同步脚本已生成:")
         print(f"  - Linux/Mac: scripts/batch_sync.sh")
@@ -290,9 +356,10 @@ class EnhancedSyncChecker:
             print(f"  2. 补充记录数很少的股票 (< 30条记录)")
             print(f"  3. 补充其他部分同步的股票")
     
-    def run_full_check(self, check_indexes=True, check_consistency=True):
+    def run_full_check(self, check_indexes=True, check_consistency=True, deep=False):
         """运行完整检查"""
         start_time = time.time()
+        self._refresh_check_dates()
         
         if not self.connect_db():
             return None
@@ -321,59 +388,45 @@ class EnhancedSyncChecker:
             print(f"\n🔍 检查历史数据同步情况...")
             print("  正在执行批量查询，请稍候...")
             
-            self.cursor.execute("""
-                SELECT 股票代码,
-                       COUNT(*) as record_count,
-                       MIN(日期) as earliest_date,
-                       MAX(日期) as latest_date
-                FROM stock_stock_zh_a_hist 
-                GROUP BY 股票代码
-            """)
-            
-            hist_data = {}
+            # 使用独立的非缓冲游标流式读取聚合结果，每批读取后立即汇总并丢弃
+            hist_stats = {}
             total_records = 0
-            for row in self.cursor.fetchall():
-                stock_code, record_count, earliest_date, latest_date = row
-                hist_data[stock_code] = {
-                    'record_count': record_count,
-                    'earliest_date': earliest_date,
-                    'latest_date': latest_date
-                }
-                total_records += record_count
+            consistency_candidates = []
+            with closing(self.conn.cursor(buffered=False)) as hist_cursor:
+                hist_cursor.execute("""
+                    SELECT 股票代码,
+                           COUNT(*) as record_count,
+                           MIN(日期) as earliest_date,
+                           MAX(日期) as latest_date
+                    FROM stock_stock_zh_a_hist 
+                    GROUP BY 股票代码
+                """)
+                while True:
+                    rows = hist_cursor.fetchmany(2000)
+                    if not rows:
+                        break
+                    for stock_code, record_count, earliest_date, latest_date in rows:
+                        hist_stats[stock_code] = (record_count, earliest_date, latest_date)
+                        total_records += record_count
+                        if record_count > 1000:
+                            consistency_candidates.append(stock_code)
             
-            print(f"  已获取 {len(hist_data)} 只股票的历史数据统计")
+            print(f"  已获取 {len(hist_stats)} 只股票的历史数据统计")
             
-            # 4. 分析同步状态
-            synced_stocks = []
-            unsynced_stocks = []
-            partial_synced = []
+            # 4. 分析同步状态（向量化判断，规则与 is_stock_fully_synced 一致）
+            missing_stats = (None, None, None)
+            merged = pd.DataFrame(
+                [stock + hist_stats.get(stock[0], missing_stats) for stock in all_stocks],
+                columns=['code', 'name', 'list_date', 'record_count', 'earliest_date', 'latest_date']
+            )
+            synced_mask, has_hist = self.classify_sync_status(merged)
             
-            for stock_code, stock_name, list_date in all_stocks:
-                if stock_code in hist_data:
-                    data = hist_data[stock_code]
-                    record_count = data['record_count']
-                    
-                    stock_info = {
-                        'code': stock_code,
-                        'name': stock_name,
-                        'list_date': list_date,
-                        'record_count': record_count,
-                        'earliest_date': data['earliest_date'],
-                        'latest_date': data['latest_date']
-                    }
-                    
-                    # 使用智能判断逻辑
-                    if self.is_stock_fully_synced(stock_code, stock_name, list_date, 
-                                                record_count, data['earliest_date'], data['latest_date']):
-                        synced_stocks.append(stock_info)
-                    else:
-                        partial_synced.append(stock_info)
-                else:
-                    unsynced_stocks.append({
-                        'code': stock_code,
-                        'name': stock_name,
-                        'list_date': list_date
-                    })
+            stock_columns = ['code', 'name', 'list_date', 'record_count', 'earliest_date', 'latest_date']
+            synced_stocks = (merged.loc[has_hist & synced_mask, stock_columns]
+                             .astype({'record_count': 'int64'}).to_dict('records'))
+            partial_synced = (merged.loc[has_hist & ~synced_mask, stock_columns]
+                              .astype({'record_count': 'int64'}).to_dict('records'))
+            unsynced_stocks = merged.loc[~has_hist, ['code', 'name', 'list_date']].to_dict('records')
             
             # 5. 显示统计结果
             print(f"\n" + "=" * 80)
@@ -388,7 +441,7 @@ class EnhancedSyncChecker:
             
             # 6. 数据一致性检查（可选）
             if check_consistency:
-                self.check_data_consistency()
+                self.check_data_consistency(consistency_candidates, deep=deep)
             
             # 7. 同步模式分析
             self.analyze_sync_patterns(synced_stocks, partial_synced, unsynced_stocks)
@@ -422,6 +475,7 @@ def main():
     parser.add_argument('--no-indexes', action='store_true', help='跳过索引检查')
     parser.add_argument('--no-consistency', action='store_true', help='跳过数据一致性检查')
     parser.add_argument('--quick', action='store_true', help='快速模式（跳过索引和一致性检查）')
+    parser.add_argument('--deep', action='store_true', help='深度检查（包含全表重复数据扫描）')
     
     args = parser.parse_args()
     
@@ -432,7 +486,8 @@ def main():
     
     result = checker.run_full_check(
         check_indexes=check_indexes,
-        check_consistency=check_consistency
+        check_consistency=check_consistency,
+        deep=args.deep
     )
     
     if result:
@@ -3,94 +3,175 @@
 数据库优化工具
 创建推荐的索引以提升查询性能
 """
-import mysql.connector
 import sys
 import os
+from contextlib import closing
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.database_config import DatabaseConfig
+from utils.db_pool import get_pool
+
+def _has_duplicate_rows(cursor):
+    """添加唯一键前的检查：存在重复的 (股票代码, 日期) 时提示并返回False"""
+    cursor.execute("""
+        SELECT 股票代码, 日期, COUNT(*) AS cnt
+        FROM stock_stock_zh_a_hist
+        GROUP BY 股票代码, 日期
+        HAVING cnt > 1
+        LIMIT 5
+    """)
+    duplicates = cursor.fetchall()
+    if not duplicates:
+        return True
+    
+    print("   ❌ 存在重复的 (股票代码, 日期) 记录，无法添加唯一约束 uk_code_date:")
+    for code, trade_date, cnt in duplicates:
+        print(f"      {code} {trade_date}: {cnt} 条")
+    print("   ⚠️  没有唯一约束时，历史行情的 upsert 写入会追加重复行而不是更新")
+    print("   💡 请先清理重复数据（每个股票代码+日期只保留一行）后重新运行本工具")
+    return False
 
 def optimize_database():
     """优化数据库性能"""
-    db_config = DatabaseConfig()
-    
     try:
-        conn = mysql.connector.connect(
-            host=db_config.host,
-            user=db_config.user,
-            password=db_config.password,
-            database=db_config.database,
-            autocommit=True
-        )
-        
-        cursor = conn.cursor()
-        
-        print("🔧 正在优化数据库性能...")
-        print("=" * 60)
-        
-        # 检查现有索引
-        cursor.execute("SHOW INDEX FROM stock_stock_zh_a_hist")
-        existing_indexes = [row[2] for row in cursor.fetchall()]
-        
-        print(f"📊 现有索引: {existing_indexes}")
-        
-        # 创建推荐的索引
-        indexes_to_create = [
-            {
-                'name': 'idx_stock_code',
-                'sql': 'CREATE INDEX idx_stock_code ON stock_stock_zh_a_hist(股票代码(10))',
-                'description': '股票代码索引 - 提升按股票查询性能'
-            },
-            {
-                'name': 'idx_date',
-                'sql': 'CREATE INDEX idx_date ON stock_stock_zh_a_hist(日期)',
-                'description': '日期索引 - 提升按日期查询性能'
-            },
-            {
-                'name': 'idx_stock_date',
-                'sql': 'CREATE INDEX idx_stock_date ON stock_stock_zh_a_hist(股票代码(10), 日期)',
-                'description': '复合索引 - 提升股票+日期组合查询性能'
-            }
-        ]
-        
-        created_count = 0
-        for index_info in indexes_to_create:
-            if index_info['name'] not in existing_indexes:
+        with closing(get_pool().get_connection()) as conn, closing(conn.cursor()) as cursor:
+            print("🔧 正在优化数据库性能...")
+            print("=" * 60)
+            
+            # 检查现有索引
+            cursor.execute("""
+                SELECT DISTINCT INDEX_NAME
+                FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, ('stock_stock_zh_a_hist',))
+            existing_indexes = {row[0] for row in cursor.fetchall()}
+            
+            print(f"📊 现有索引: {sorted(existing_indexes)}")
+            
+            # 创建推荐的索引
+            # 复合索引列顺序很重要：按最左前缀原则，(股票代码, 日期) 同时服务于只按股票代码的查询，
+            # 因此不再单独创建股票代码索引。唯一键 uk_code_date 本身就是这个复合索引，
+            # 只有在因重复数据无法创建唯一键时才退而创建普通索引 idx_stock_date
+            indexes_to_create = [
+                {
+                    'name': 'idx_date',
+                    'sql': 'CREATE INDEX idx_date ON stock_stock_zh_a_hist(日期)',
+                    'description': '日期索引 - 提升按日期查询性能'
+                },
+                {
+                    'name': 'uk_code_date',
+                    'sql': 'ALTER TABLE stock_stock_zh_a_hist ADD UNIQUE KEY uk_code_date (股票代码(10), 日期)',
+                    'description': '唯一约束 - 由数据库保证同一股票同一日期不重复，同时作为股票+日期复合索引',
+                    'precheck': _has_duplicate_rows
+                },
+                {
+                    'name': 'idx_stock_date',
+                    'sql': 'CREATE INDEX idx_stock_date ON stock_stock_zh_a_hist(股票代码(10), 日期) USING BTREE',
+                    'description': '复合索引 - 唯一约束无法创建时提升按股票及股票+日期组合查询性能',
+                    'skip_if': 'uk_code_date'
+                }
+            ]
+            
+            created_count = 0
+            for index_info in indexes_to_create:
+                if index_info.get('skip_if') in existing_indexes:
+                    print(f"⏭️  索引 {index_info['name']} 已由 {index_info['skip_if']} 覆盖，跳过")
+                    continue
+                if index_info['name'] not in existing_indexes:
+                    precheck = index_info.get('precheck')
+                    if precheck is not None and not precheck(cursor):
+                        continue
+                    try:
+                        print(f"🔨 创建索引: {index_info['name']}")
+                        print(f"   描述: {index_info['description']}")
+                        cursor.execute(index_info['sql'])
+                        print(f"   ✅ 创建成功")
+                        existing_indexes.add(index_info['name'])
+                        created_count += 1
+                    except Exception as e:
+                        print(f"   ❌ 创建失败: {e}")
+                else:
+                    print(f"⏭️  索引 {index_info['name']} 已存在，跳过")
+            
+            # 删除被复合索引覆盖的冗余索引，减少每次写入的索引维护开销
+            redundant_indexes = [
+                {
+                    'name': 'idx_stock_date',
+                    'covered_by': 'uk_code_date',
+                    'sql': 'ALTER TABLE stock_stock_zh_a_hist DROP INDEX idx_stock_date'
+                },
+                {
+                    'name': 'idx_stock_code',
+                    'covered_by': ('uk_code_date', 'idx_stock_date'),
+                    'sql': 'ALTER TABLE stock_stock_zh_a_hist DROP INDEX idx_stock_code'
+                }
+            ]
+            
+            for index_info in redundant_indexes:
+                covered_by = index_info['covered_by']
+                if isinstance(covered_by, str):
+                    covered_by = (covered_by,)
+                covering = next((name for name in covered_by if name in existing_indexes), None)
+                if index_info['name'] in existing_indexes and covering:
+                    try:
+                        print(f"🗑️  删除冗余索引: {index_info['name']} (已被 {covering} 覆盖)")
+                        cursor.execute(index_info['sql'])
+                        existing_indexes.discard(index_info['name'])
+                        print(f"   ✅ 删除成功")
+                    except Exception as e:
+                        print(f"   ❌ 删除失败: {e}")
+            
+            # 为包含 created_at 列但尚无以其开头的索引的表创建索引，供按时间清理旧数据使用
+            cursor.execute("""
+                SELECT c.TABLE_NAME
+                FROM information_schema.COLUMNS c
+                JOIN information_schema.TABLES t
+                  ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+                WHERE c.TABLE_SCHEMA = DATABASE()
+                  AND c.COLUMN_NAME = 'created_at'
+                  AND t.TABLE_TYPE = 'BASE TABLE'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM information_schema.STATISTICS s
+                      WHERE s.TABLE_SCHEMA = c.TABLE_SCHEMA
+                        AND s.TABLE_NAME = c.TABLE_NAME
+                        AND s.COLUMN_NAME = 'created_at'
+                        AND s.SEQ_IN_INDEX = 1
+                  )
+            """)
+            for (table_name,) in cursor.fetchall():
                 try:
-                    print(f"🔨 创建索引: {index_info['name']}")
-                    print(f"   描述: {index_info['description']}")
-                    cursor.execute(index_info['sql'])
+                    print(f"🔨 创建索引: {table_name}.idx_created_at")
+                    print(f"   描述: 创建时间索引 - 提升按时间清理旧数据的性能")
+                    cursor.execute(f"CREATE INDEX idx_created_at ON `{table_name}`(created_at)")
                     print(f"   ✅ 创建成功")
                     created_count += 1
                 except Exception as e:
                     print(f"   ❌ 创建失败: {e}")
-            else:
-                print(f"⏭️  索引 {index_info['name']} 已存在，跳过")
-        
-        print(f"\n📊 优化结果:")
-        print(f"  成功创建 {created_count} 个索引")
-        
-        if created_count > 0:
-            print(f"\n💡 建议:")
-            print(f"  - 索引创建后，查询性能将显著提升")
-            print(f"  - 可以重新运行同步检查工具验证性能改善")
-            print(f"  - 定期运行 ANALYZE TABLE 命令更新统计信息")
-        
-        # 显示表统计信息
-        cursor.execute("SELECT COUNT(*) FROM stock_stock_zh_a_hist")
-        total_records = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT 股票代码) FROM stock_stock_zh_a_hist")
-        unique_stocks = cursor.fetchone()[0]
-        
-        print(f"\n📈 表统计信息:")
-        print(f"  总记录数: {total_records:,}")
-        print(f"  股票数量: {unique_stocks:,}")
-        print(f"  平均每股记录数: {total_records/unique_stocks:.0f}")
-        
-        cursor.close()
-        conn.close()
-        
-        return created_count
+            
+            print(f"\n📊 优化结果:")
+            print(f"  成功创建 {created_count} 个索引")
+            
+            if created_count > 0:
+                # 刷新统计信息，使 information_schema 中的行数估算（监控面板使用）保持准确
+                cursor.execute("ANALYZE TABLE stock_stock_zh_a_hist")
+                cursor.fetchall()
+                
+                print(f"\n💡 建议:")
+                print(f"  - 索引创建后，查询性能将显著提升")
+                print(f"  - 可以重新运行同步检查工具验证性能改善")
+                print(f"  - 定期运行 ANALYZE TABLE 命令更新统计信息")
+            
+            # 显示表统计信息（一次性工具，使用精确计数；可由 uk_code_date 索引完成）
+            cursor.execute("SELECT COUNT(*) FROM stock_stock_zh_a_hist")
+            total_records = cursor.fetchone()[0]
+            
+            cursor.execute("SELECT COUNT(DISTINCT 股票代码) FROM stock_stock_zh_a_hist")
+            unique_stocks = cursor.fetchone()[0]
+            
+            print(f"\n📈 表统计信息:")
+            print(f"  总记录数: {total_records:,}")
+            print(f"  股票数量: {unique_stocks:,}")
+            print(f"  平均每股记录数: {total_records/unique_stocks:.0f}")
+            
+            return created_count
         
     except Exception as e:
         print(f"❌ 优化失败: {e}")
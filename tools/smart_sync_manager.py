@@ -3,14 +3,19 @@
 智能同步管理器
 精确识别需要同步的股票，避免重复同步
 """
-import mysql.connector
 import sys
 import os
 import time
 import argparse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
 from datetime import datetime, date, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.database_config import DatabaseConfig
+from utils.db_pool import get_pool
+from core.sync_state import sync_state_is_current
 
 class SmartSyncManager:
     def __init__(self):
@@ -19,167 +24,152 @@ class SmartSyncManager:
         self.cursor = None
         
     def connect_db(self):
-        """连接数据库"""
+        """从共享连接池获取数据库连接"""
         try:
-            self.conn = mysql.connector.connect(
-                host=self.db_config.host,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database,
-                autocommit=True,
-                buffered=True,
-                use_unicode=True,
-                charset='utf8mb4'
-            )
-            self.cursor = self.conn.cursor()
+            self.conn = get_pool().get_connection()
+            self.cursor = self.conn.cursor(buffered=True)
             return True
         except Exception as e:
             print(f"❌ 数据库连接失败: {e}")
             return False
     
     def close_db(self):
-        """关闭数据库连接"""
+        """关闭游标并将连接归还到连接池"""
         if self.cursor:
             self.cursor.close()
         if self.conn:
             self.conn.close()
     
+    def _load_stock_stats(self):
+        """读取每只股票的基本信息及历史数据统计（未同步的股票记录数为NULL），只读
+        
+        检查点有效时读取 stock_sync_state，检查点中缺少的股票单独统计；
+        检查点不存在或已过期时直接对历史行情表做一次聚合。
+        """
+        if sync_state_is_current(self.cursor):
+            self.cursor.execute("""
+                SELECT s.A股代码, s.A股简称, s.A股上市日期,
+                       NULLIF(st.record_count, 0), st.earliest_date, st.latest_date,
+                       st.股票代码 IS NULL
+                FROM stock_stock_info s
+                LEFT JOIN stock_sync_state st ON s.A股代码 = st.股票代码
+                ORDER BY s.A股代码
+            """)
+            rows = self.cursor.fetchall()
+            missing_codes = [row[0] for row in rows if row[6]]
+            if len(missing_codes) <= 500:
+                stats = {}
+                if missing_codes:
+                    placeholders = ", ".join(["%s"] * len(missing_codes))
+                    self.cursor.execute(f"""
+                        SELECT 股票代码, COUNT(*), MIN(日期), MAX(日期)
+                        FROM stock_stock_zh_a_hist
+                        WHERE 股票代码 IN ({placeholders})
+                        GROUP BY 股票代码
+                    """, tuple(missing_codes))
+                    stats = {row[0]: row[1:] for row in self.cursor.fetchall()}
+                return [
+                    row[:3] + stats.get(row[0], (None, None, None)) if row[6] else row[:6]
+                    for row in rows
+                ]
+        
+        print("  同步状态检查点不存在或已过期，直接统计历史行情表...")
+        self.cursor.execute("""
+            SELECT s.A股代码, s.A股简称, s.A股上市日期,
+                   h.record_count, h.earliest_date, h.latest_date
+            FROM stock_stock_info s
+            LEFT JOIN (
+                SELECT 股票代码,
+                       COUNT(*) as record_count,
+                       MIN(日期) as earliest_date,
+                       MAX(日期) as latest_date
+                FROM stock_stock_zh_a_hist 
+                GROUP BY 股票代码
+            ) h ON s.A股代码 = h.股票代码
+            ORDER BY s.A股代码
+        """)
+        return self.cursor.fetchall()
+    
     def analyze_sync_needs(self):
         """分析同步需求"""
         print("🔍 分析股票同步需求...")
         print("=" * 60)
         
-        # 获取所有股票信息
-        self.cursor.execute("""
-            SELECT A股代码, A股简称, A股上市日期 
-            FROM stock_stock_info 
-            ORDER BY A股代码
-        """)
-        all_stocks = self.cursor.fetchall()
+        df = pd.DataFrame(
+            self._load_stock_stats(),
+            columns=['code', 'name', 'list_date', 'record_count', 'earliest_date', 'latest_date']
+        )
         
-        # 获取历史数据统计
-        self.cursor.execute("""
-            SELECT 股票代码,
-                   COUNT(*) as record_count,
-                   MIN(日期) as earliest_date,
-                   MAX(日期) as latest_date
-            FROM stock_stock_zh_a_hist 
-            GROUP BY 股票代码
-        """)
+        # 分析同步需求（向量化判断）
+        today = pd.Timestamp(date.today())
+        # 更合理的时间阈值：工作日考虑，周末+节假日可能有3-5天没更新
+        recent_threshold = today - pd.Timedelta(days=10)  # 10天内有更新就算正常
         
-        hist_data = {}
-        for row in self.cursor.fetchall():
-            stock_code, record_count, earliest_date, latest_date = row
-            hist_data[stock_code] = {
-                'record_count': record_count,
-                'earliest_date': earliest_date,
-                'latest_date': latest_date
-            }
+        # 与原逐行判断一致：只有 date 类型的上市日期参与新股/老股判断，字符串等其他值视为无上市日期
+        is_date = df['list_date'].map(lambda value: isinstance(value, date)).astype(bool)
+        list_date = pd.to_datetime(df['list_date'].where(is_date), errors='coerce')
+        earliest_date = pd.to_datetime(df['earliest_date'])
+        latest_date = pd.to_datetime(df['latest_date'])
+        record_count = df['record_count'].fillna(0).astype('int64')
+        days_since_listing = (today - list_date).dt.days
+        # 新股的合理记录数应该大约是交易天数（约每月20个交易日），考虑周末和节假日
+        expected_records = np.maximum(10, days_since_listing * 0.7)
         
-        # 分析同步需求
-        needs_sync = []
-        fully_synced = []
+        # 完全未同步 / 无历史数据
+        m_unsynced = df['record_count'].isna()
+        m_empty = ~m_unsynced & (record_count == 0)
+        has_list_date = ~m_unsynced & ~m_empty & list_date.notna()
+        # 上市不到3个月的新股：少于预期的一半才认为需要同步
+        m_new_stock = has_list_date & (days_since_listing <= 90) & (record_count < expected_records * 0.5)
+        # 老股票：缺少早期数据，或记录数太少（少于100条明显异常）
+        is_old_stock = has_list_date & (days_since_listing > 90)
+        m_missing_early = is_old_stock & (earliest_date > list_date + pd.Timedelta(days=60))
+        m_few = is_old_stock & (record_count < 100)
+        # 数据时效性（只对有足够历史数据、且无其他问题的股票检查）
+        m_stale = (~(m_unsynced | m_empty | m_new_stock | m_missing_early | m_few)
+                   & (record_count >= 100) & (latest_date < recent_threshold))
         
-        today = date.today()
-        # 更合理的时间阈值：工作日考虑，周末+节假日可能有3-5天没更新
-        recent_threshold = today - timedelta(days=10)  # 10天内有更新就算正常
+        count_str = record_count.astype(str)
+        conditions = [m_unsynced, m_empty, m_new_stock, m_missing_early, m_few, m_stale]
+        reasons = [
+            '完全未同步',
+            '无历史数据',
+            '新股数据不足(' + count_str + '条,预期>'
+            + expected_records.round().fillna(0).astype('int64').astype(str) + '条)',
+            '缺少早期数据(上市:' + df['list_date'].astype(str) + ', 最早:' + df['earliest_date'].astype(str) + ')',
+            '历史数据过少(' + count_str + '条)',
+            '数据过旧(最新:' + df['latest_date'].astype(str) + ')',
+        ]
+        df['reason'] = np.select(conditions, reasons, default='')
+        df['priority'] = np.select(conditions, [1, 1, 2, 2, 2, 3], default=0)
+        df['record_count'] = record_count
+        # 数据过旧的股票只需增量同步：从最新日期前3天开始获取，重叠部分用于覆盖交易所的数据修正；
+        # 其他情况（缺少早期数据、记录过少等）仍从上市日期完整同步
+        fetch_start = (latest_date - pd.Timedelta(days=3)).dt.strftime('%Y-%m-%d')
+        df['fetch_start'] = fetch_start.astype(object).where(m_stale, None)
         
-        for stock_code, stock_name, list_date in all_stocks:
-            if stock_code not in hist_data:
-                # 完全未同步
-                needs_sync.append({
-                    'code': stock_code,
-                    'name': stock_name,
-                    'list_date': list_date,
-                    'reason': '完全未同步',
-                    'priority': 1,
-                    'record_count': 0
-                })
-            else:
-                data = hist_data[stock_code]
-                record_count = data['record_count']
-                latest_date = data['latest_date']
-                earliest_date = data['earliest_date']
-                
-                # 判断是否需要同步
-                needs_update = False
-                reason = ""
-                priority = 3
-                
-                # 检查1: 完全没有数据（理论上不会到这里，但保险起见）
-                if record_count == 0:
-                    needs_update = True
-                    reason = "无历史数据"
-                    priority = 1
-                
-                # 检查2: 对于新上市股票（上市不到3个月），记录数过少才需要同步
-                elif list_date and isinstance(list_date, date):
-                    days_since_listing = (today - list_date).days
-                    
-                    if days_since_listing <= 90:  # 上市不到3个月的新股
-                        # 新股的合理记录数应该大约是交易天数（约每月20个交易日）
-                        expected_records = max(10, days_since_listing * 0.7)  # 考虑周末和节假日
-                        if record_count < expected_records * 0.5:  # 少于预期的一半才认为需要同步
-                            needs_update = True
-                            reason = f"新股数据不足({record_count}条,预期>{expected_records:.0f}条)"
-                            priority = 2
-                    else:
-                        # 老股票：记录数太少（少于100条明显异常）
-                        if record_count < 100:
-                            needs_update = True
-                            reason = f"历史数据过少({record_count}条)"
-                            priority = 2
-                        
-                        # 检查是否缺少早期数据
-                        if earliest_date > list_date + timedelta(days=60):
-                            needs_update = True
-                            reason = f"缺少早期数据(上市:{list_date}, 最早:{earliest_date})"
-                            priority = 2
-                
-                # 检查3: 数据时效性（只对有足够历史数据的股票检查）
-                if not needs_update and record_count >= 100:
-                    if latest_date < recent_threshold:
-                        needs_update = True
-                        reason = f"数据过旧(最新:{latest_date})"
-                        priority = 3
-                
-                if needs_update:
-                    needs_sync.append({
-                        'code': stock_code,
-                        'name': stock_name,
-                        'list_date': list_date,
-                        'reason': reason,
-                        'priority': priority,
-                        'record_count': record_count,
-                        'latest_date': latest_date
-                    })
-                else:
-                    fully_synced.append({
-                        'code': stock_code,
-                        'name': stock_name,
-                        'record_count': record_count,
-                        'latest_date': latest_date
-                    })
+        needs_mask = df['priority'] > 0
+        # 按优先级分组，组内按记录数升序（记录数越少越优先）
+        needs_df = df.loc[needs_mask, ['code', 'name', 'list_date', 'reason', 'priority',
+                                       'record_count', 'latest_date', 'fetch_start']]
+        needs_df = needs_df.sort_values(['priority', 'record_count'], kind='stable')
+        priority_groups = defaultdict(list)
+        for priority, group in needs_df.groupby('priority'):
+            priority_groups[int(priority)] = group.to_dict('records')
+        fully_synced = df.loc[~needs_mask, ['code', 'name', 'record_count', 'latest_date']].to_dict('records')
         
-        return needs_sync, fully_synced
+        return priority_groups, fully_synced
     
-    def generate_smart_sync_plan(self, needs_sync):
-        """生成智能同步计划"""
-        if not needs_sync:
+    def generate_smart_sync_plan(self, priority_groups):
+        """生成智能同步计划，priority_groups 为 analyze_sync_needs 返回的已排序分组"""
+        total_needs = sum(len(stocks) for stocks in priority_groups.values())
+        if not total_needs:
             print("🎉 所有股票都已完全同步！")
             return
         
-        print(f"\n📋 智能同步计划 ({len(needs_sync)} 只股票需要同步)")
+        print(f"\n📋 智能同步计划 ({total_needs} 只股票需要同步)")
         print("=" * 60)
         
-        # 按优先级排序
-        needs_sync.sort(key=lambda x: (x['priority'], x['record_count']))
-        
-        # 按优先级分组
-        priority_groups = {1: [], 2: [], 3: []}
-        for stock in needs_sync:
-            priority_groups[stock['priority']].append(stock)
-        
         # 显示同步计划
         priority_names = {
             1: "🔴 高优先级 - 完全未同步",
@@ -187,9 +177,6 @@ class SmartSyncManager:
             3: "🟢 低优先级 - 其他"
         }
         
-        total_commands = 0
-        sync_commands = []
-        
         for priority in [1, 2, 3]:
             stocks = priority_groups[priority]
             if not stocks:
@@ -200,36 +187,30 @@ class SmartSyncManager:
             
             for i, stock in enumerate(stocks, 1):
                 print(f"  {i:2d}. {stock['code']} ({stock['name']}) - {stock['reason']}")
-                sync_commands.append(f"python core/smart_stock_sync.py continue {stock['code']}  # {stock['name']} - {stock['reason']}")
-                total_commands += 1
         
         # 生成批量同步脚本
-        self.generate_batch_script(sync_commands, needs_sync)
-        
-        return sync_commands
+        self.generate_batch_script(priority_groups)
     
-    def generate_batch_script(self, sync_commands, needs_sync):
+    def generate_batch_script(self, priority_groups):
         """生成批量同步脚本"""
-        if not sync_commands:
+        total_needs = sum(len(stocks) for stocks in priority_groups.values())
+        if not total_needs:
             return
         
-        # Windows批处理脚本
-        bat_content = f"""@echo off
-REM 智能股票数据同步脚本
-REM 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-REM 需要同步的股票数量: {len(needs_sync)}
-
-echo 开始智能股票数据同步...
-echo 总共需要同步 {len(needs_sync)} 只股票
-echo.
-
-"""
+        # Windows批处理脚本（逐行收集，最后一次性写入）
+        parts = [
+            "@echo off\n",
+            "REM 智能股票数据同步脚本\n",
+            f"REM 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+            f"REM 需要同步的股票数量: {total_needs}\n",
+            "\n",
+            "echo 开始智能股票数据同步...\n",
+            f"echo 总共需要同步 {total_needs} 只股票\n",
+            "echo.\n",
+            "\n",
+        ]
         
         # 按优先级分组执行
-        priority_groups = {1: [], 2: [], 3: []}
-        for stock in needs_sync:
-            priority_groups[stock['priority']].append(stock)
-        
         priority_names = {
             1: "高优先级股票(完全未同步)",
             2: "中优先级股票(数据不完整/过旧)",
@@ -241,40 +222,83 @@ echo.
             if not stocks:
                 continue
             
-            bat_content += f"""echo ========================================
-echo 开始同步{priority_names[priority]}
-echo 数量: {len(stocks)} 只
-echo ========================================
-
-"""
-            
-            for stock in stocks:
-                bat_content += f'python core/smart_stock_sync.py continue {stock["code"]}  REM {stock["name"]} - {stock["reason"]}\n'
+            parts.extend([
+                "echo ========================================\n",
+                f"echo 开始同步{priority_names[priority]}\n",
+                f"echo 数量: {len(stocks)} 只\n",
+                "echo ========================================\n",
+                "\n",
+            ])
+            # 每个优先级的股票代码写入一个文件，由单个同步进程依次处理，
+            # 避免每只股票都启动一次解释器并重新连接数据库
+            codes_file = f'scripts/sync_codes_priority_{priority}.txt'
+            with open(codes_file, 'w', encoding='utf-8') as f:
+                f.writelines(
+                    f'{stock["code"]} {stock["fetch_start"] or ""}  # {stock["name"]} - {stock["reason"]}\n'
+                    for stock in stocks
+                )
             
-            bat_content += "\necho.\n"
+            parts.append(f'python core/smart_stock_sync.py continue --codes-file {codes_file}\n')
+            parts.append("\necho.\n")
         
-        bat_content += """echo ========================================
-echo 智能同步完成！
-echo ========================================
-pause
-"""
+        parts.extend([
+            "echo ========================================\n",
+            "echo 智能同步完成！\n",
+            "echo ========================================\n",
+            "pause\n",
+        ])
         
         # 保存脚本
         with open('scripts/smart_sync.bat', 'w', encoding='utf-8') as f:
-            f.write(bat_content)
+            f.write(''.join(parts))
         
-        # Linux脚本
-        sh_content = bat_content.replace('@echo off', '#!/bin/bash')
-        sh_content = sh_content.replace('REM ', '# ')
-        sh_content = sh_content.replace('echo.', 'echo')
-        sh_content = sh_content.replace('pause', 'read -p "按回车键继续..."')
+        # Linux脚本：由同一组行逐行转换得到
+        sh_parts = [
+            part.replace('@echo off', '#!/bin/bash')
+                .replace('REM ', '# ')
+                .replace('echo.', 'echo')
+                .replace('pause', 'read -p "按回车键继续..."')
+            for part in parts
+        ]
         
         with open('scripts/smart_sync.sh', 'w', encoding='utf-8') as f:
-            f.write(sh_content)
+            f.write(''.join(sh_parts))
         
         print(f"\n🚀 智能同步脚本已生成:")
         print(f"  - Windows: scripts/smart_sync.bat")
         print(f"  - Linux/Mac: scripts/smart_sync.sh")
+        print(f"  - 股票代码文件: scripts/sync_codes_priority_<优先级>.txt")
+    
+    def execute_sync_plan(self, priority_groups, max_workers=8):
+        """在线程池中按优先级执行同步计划，每个工作线程复用自己的数据库连接"""
+        from core.batch_sync_stocks import disable_proxy_for_process
+        from core.smart_stock_sync import sync_stock, sync_stock_from, close_thread_syncers
+        
+        def sync_one(stock):
+            try:
+                if stock.get('fetch_start'):
+                    return sync_stock_from(stock['code'], stock['name'], stock['fetch_start'].replace('-', ''))
+                return sync_stock(stock['code'])
+            except Exception as e:
+                print(f"  ❌ {stock['code']} 同步异常: {e}")
+                return False
+        
+        stocks = [stock for priority in (1, 2, 3) for stock in priority_groups[priority]]
+        # 限制并发数，避免耗尽 MySQL 的 max_connections 及请求过于频繁
+        workers = min(max_workers, len(stocks))
+        print(f"使用 {workers} 个线程同步 {len(stocks)} 只股票")
+        
+        # 代理设置是进程级的，在启动工作线程前统一禁用一次
+        disable_proxy_for_process()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(sync_one, stocks))
+        finally:
+            close_thread_syncers()
+        
+        success_count = sum(results)
+        print(f"\n✅ 同步完成 - 成功: {success_count}, 失败: {len(results) - success_count}")
+        return results
     
     def run_analysis(self):
         """运行完整分析"""
@@ -284,16 +308,17 @@ pause
             return None
         
         try:
-            needs_sync, fully_synced = self.analyze_sync_needs()
+            priority_groups, fully_synced = self.analyze_sync_needs()
+            needs_count = sum(len(stocks) for stocks in priority_groups.values())
             
             print(f"\n📊 同步需求分析结果:")
             print("=" * 60)
             print(f"✅ 已完全同步: {len(fully_synced):,} 只股票")
-            print(f"⚠️  需要同步: {len(needs_sync):,} 只股票")
-            print(f"📈 同步完成率: {len(fully_synced)/(len(fully_synced)+len(needs_sync))*100:.1f}%")
+            print(f"⚠️  需要同步: {needs_count:,} 只股票")
+            print(f"📈 同步完成率: {len(fully_synced)/(len(fully_synced)+needs_count)*100:.1f}%")
             
-            if needs_sync:
-                sync_commands = self.generate_smart_sync_plan(needs_sync)
+            if needs_count:
+                self.generate_smart_sync_plan(priority_groups)
                 
                 print(f"\n💡 执行建议:")
                 print("-" * 40)
@@ -307,9 +332,10 @@ pause
             print(f"\n⏱️  分析耗时: {end_time - start_time:.2f} 秒")
             
             return {
-                'needs_sync': needs_sync,
+                'priority_groups': priority_groups,
+                'needs_count': needs_count,
                 'fully_synced': fully_synced,
-                'sync_rate': len(fully_synced)/(len(fully_synced)+len(needs_sync))*100
+                'sync_rate': len(fully_synced)/(len(fully_synced)+needs_count)*100
             }
             
         finally:
@@ -324,10 +350,9 @@ def main():
     manager = SmartSyncManager()
     result = manager.run_analysis()
     
-    if result and args.execute and result['needs_sync']:
+    if result and args.execute and result['needs_count']:
         print(f"\n🚀 开始执行同步...")
-        # 这里可以添加自动执行同步的逻辑
-        pass
+        manager.execute_sync_plan(result['priority_groups'])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,12 +1,14 @@
 """
 系统监控工具
 """
+import sys
 import time
 import psutil
-import mysql.connector
+from contextlib import closing
 from datetime import datetime
 from config.database_config import DatabaseConfig
 from utils.data_manager import DataManager
+from utils.db_pool import get_pool
 from views.console_view import ConsoleView
 import logging
 
@@ -20,115 +22,127 @@ class SystemMonitor:
         self.db_config = DatabaseConfig()
         self.data_manager = DataManager(self.db_config)
         self.view = ConsoleView()
+        self._disk_cache = (0.0, None)  # (采样时间, 磁盘使用率)
+        self._table_stats_cache = (0.0, None)  # (查询时间, 表统计信息)
+        # 初始化CPU采样基准，之后的非阻塞调用返回距上次调用期间的CPU使用率
+        psutil.cpu_percent(interval=None)
+    
+    def _get_disk_percent(self, ttl: float = 30) -> float:
+        """获取磁盘使用率，结果缓存 ttl 秒"""
+        sampled_at, disk_percent = self._disk_cache
+        now = time.monotonic()
+        if disk_percent is None or now - sampled_at >= ttl:
+            disk_percent = psutil.disk_usage('/').percent
+            self._disk_cache = (now, disk_percent)
+        return disk_percent
     
     def get_system_info(self) -> dict:
         """获取系统信息"""
         return {
-            'cpu_percent': psutil.cpu_percent(interval=1),
+            'cpu_percent': psutil.cpu_percent(interval=None),
             'memory_percent': psutil.virtual_memory().percent,
-            'disk_percent': psutil.disk_usage('/').percent,
+            'disk_percent': self._get_disk_percent(),
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
     
     def get_database_status(self) -> dict:
         """获取数据库状态"""
         try:
-            conn = mysql.connector.connect(
-                host=self.db_config.host,
-                user=self.db_config.user,
-                password=self.db_config.password,
-                database=self.db_config.database
-            )
-            
-            cursor = conn.cursor()
-            
-            # 获取数据库大小
-            cursor.execute(f"""
-                SELECT 
-                    ROUND(SUM(data_length + index_length) / 1024 / 1024, 2) AS 'DB Size (MB)'
-                FROM information_schema.tables 
-                WHERE table_schema = '{self.db_config.database}'
-            """)
-            db_size = cursor.fetchone()[0]
-            
-            # 获取表数量
-            cursor.execute("SHOW TABLES")
-            table_count = len(cursor.fetchall())
-            
-            # 获取连接数
-            cursor.execute("SHOW STATUS LIKE 'Threads_connected'")
-            connections = cursor.fetchone()[1]
-            
-            cursor.close()
-            conn.close()
+            with closing(get_pool().get_connection()) as conn, closing(conn.cursor()) as cursor:
+                # 获取数据库大小
+                cursor.execute("""
+                    SELECT 
+                        ROUND(SUM(data_length + index_length) / 1024 / 1024, 2) AS 'DB Size (MB)'
+                    FROM information_schema.tables 
+                    WHERE table_schema = %s
+                """, (self.db_config.database,))
+                db_size = cursor.fetchone()[0]
+                
+                # 获取表数量
+                cursor.execute("SHOW TABLES")
+                table_count = len(cursor.fetchall())
+                
+                # 获取连接数
+                cursor.execute("SHOW STATUS LIKE 'Threads_connected'")
+                connections = cursor.fetchone()[1]
             
             return {
                 'status': 'connected',
                 'database_size_mb': db_size,
                 'table_count': table_count,
-                'connections': connections
+                'connections': connections,
+                # 历史行情表记录数取估算值，避免每次刷新都执行 COUNT(*) 全表扫描
+                'hist_records': self.data_manager.get_row_estimate('stock_stock_zh_a_hist')
             }
             
         except Exception as e:
             logger.error(f"获取数据库状态失败: {e}")
             return {'status': 'disconnected', 'error': str(e)}
     
-    def get_table_statistics(self) -> list:
-        """获取表统计信息"""
-        tables = self.data_manager.get_table_list()
-        stats = []
+    def get_table_statistics(self, ttl: float = 30) -> list:
+        """获取表统计信息（记录数为 information_schema 估算值），结果缓存 ttl 秒"""
+        fetched_at, cached_stats = self._table_stats_cache
+        now = time.monotonic()
+        if cached_stats is not None and now - fetched_at < ttl:
+            return cached_stats
         
-        for table in tables:
-            info = self.data_manager.get_table_info(table)
-            if info:
-                stats.append({
-                    'table_name': table,
-                    'record_count': info.get('record_count', 0),
-                    'last_updated': info.get('last_updated', 'N/A')
-                })
+        stats = [
+            {
+                'table_name': table,
+                'record_count': info.get('record_count', 0),
+                'last_updated': info.get('last_updated', 'N/A')
+            }
+            for table, info in self.data_manager.get_all_table_info().items()
+        ]
         
-        return sorted(stats, key=lambda x: x['record_count'], reverse=True)
+        stats = sorted(stats, key=lambda x: x['record_count'], reverse=True)
+        self._table_stats_cache = (now, stats)
+        return stats
+    
+    def _render_frame(self, sys_info: dict, db_status: dict, table_stats: list) -> str:
+        """把一帧监控面板渲染为字符串"""
+        lines = [
+            "🖥️  AKShare数据同步系统监控面板",
+            "=" * 60,
+            f"⏰ 时间: {sys_info['timestamp']}",
+            f"💻 CPU使用率: {sys_info['cpu_percent']:.1f}%",
+            f"🧠 内存使用率: {sys_info['memory_percent']:.1f}%",
+            f"💾 磁盘使用率: {sys_info['disk_percent']:.1f}%",
+            "\n" + "=" * 60,
+        ]
+        
+        # 数据库状态
+        if db_status['status'] == 'connected':
+            lines.append("🗄️  数据库状态: ✅ 已连接")
+            lines.append(f"📊 数据库大小: {db_status['database_size_mb']:.2f} MB")
+            lines.append(f"📋 表数量: {db_status['table_count']}")
+            lines.append(f"🔗 连接数: {db_status['connections']}")
+            if db_status['hist_records'] is not None:
+                lines.append(f"📈 历史行情记录数: 约 {db_status['hist_records']:,} 条")
+        else:
+            lines.append("🗄️  数据库状态: ❌ 连接失败")
+            lines.append(f"❗ 错误: {db_status.get('error', 'Unknown')}")
+        
+        lines.append("\n" + "=" * 60)
+        
+        # 表统计
+        lines.append("📈 数据表统计 (按记录数排序):")
+        for i, stat in enumerate(table_stats[:10], 1):  # 显示前10个表
+            lines.append(f"{i:2d}. {stat['table_name']:<30} {stat['record_count']:>10,} 条")
+        
+        lines.append("\n按 Ctrl+C 退出监控")
+        return "\n".join(lines) + "\n"
     
     def display_dashboard(self):
         """显示监控面板"""
         while True:
             try:
-                # 清屏
-                import os
-                os.system('cls' if os.name == 'nt' else 'clear')
-                
-                print("🖥️  AKShare数据同步系统监控面板")
-                print("=" * 60)
-                
-                # 系统信息
-                sys_info = self.get_system_info()
-                print(f"⏰ 时间: {sys_info['timestamp']}")
-                print(f"💻 CPU使用率: {sys_info['cpu_percent']:.1f}%")
-                print(f"🧠 内存使用率: {sys_info['memory_percent']:.1f}%")
-                print(f"💾 磁盘使用率: {sys_info['disk_percent']:.1f}%")
-                
-                print("\n" + "=" * 60)
-                
-                # 数据库状态
-                db_status = self.get_database_status()
-                if db_status['status'] == 'connected':
-                    print("🗄️  数据库状态: ✅ 已连接")
-                    print(f"📊 数据库大小: {db_status['database_size_mb']:.2f} MB")
-                    print(f"📋 表数量: {db_status['table_count']}")
-                    print(f"🔗 连接数: {db_status['connections']}")
-                else:
-                    print("🗄️  数据库状态: ❌ 连接失败")
-                    print(f"❗ 错误: {db_status.get('error', 'Unknown')}")
-                
-                print("\n" + "=" * 60)
-                
-                # 表统计
-                print("📈 数据表统计 (按记录数排序):")
-                table_stats = self.get_table_statistics()
-                for i, stat in enumerate(table_stats[:10], 1):  # 显示前10个表
-                    print(f"{i:2d}. {stat['table_name']:<30} {stat['record_count']:>10,} 条")
-                
-                print("\n按 Ctrl+C 退出监控")
+                frame = self._render_frame(self.get_system_info(),
+                                           self.get_database_status(),
+                                           self.get_table_statistics())
+                # ANSI 光标归位+清屏，整帧一次写出，避免调用外部 cls/clear
+                sys.stdout.write('\033[H\033[2J' + frame)
+                sys.stdout.flush()
                 time.sleep(5)  # 每5秒刷新一次
                 
             except KeyboardInterrupt:
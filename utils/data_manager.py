@@ -2,22 +2,37 @@
 数据管理工具
 """
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from typing import List, Dict, Any, Optional
 import logging
 
+from utils.engine import get_engine
+
 logger = logging.getLogger(__name__)
 
 
+def quote_table_name(conn, schema: str, table_name: str) -> str:
+    """确认表存在于指定数据库后返回反引号包裹的表名，防止通过表名注入SQL"""
+    exists = conn.execute(text("""
+        SELECT 1 
+        FROM information_schema.tables 
+        WHERE table_schema = :schema AND table_name = :table
+    """), {'schema': schema, 'table': table_name}).scalar()
+    if not exists:
+        raise ValueError(f"表 {table_name} 不存在")
+    return '`' + table_name.replace('`', '``') + '`'
+
+
 class DataManager:
     """数据管理类"""
     
     def __init__(self, db_config):
         self.db_config = db_config
-        self.engine = create_engine(
-            db_config.get_connection_string(),
-            **db_config.get_engine_config()
-        )
+        self.engine = get_engine(db_config)
+    
+    def _safe_ident(self, conn, table_name: str) -> str:
+        """校验表名并返回可直接拼入SQL的标识符"""
+        return quote_table_name(conn, self.db_config.database, table_name)
     
     def get_table_list(self) -> List[str]:
         """获取所有表名"""
@@ -33,21 +48,23 @@ class DataManager:
         """获取表信息"""
         try:
             with self.engine.connect() as conn:
+                tbl = self._safe_ident(conn, table_name)
+                
                 # 获取表结构
-                result = conn.execute(text(f"DESCRIBE {table_name}"))
+                result = conn.execute(text("DESCRIBE " + tbl))
                 columns = result.fetchall()
                 
                 # 获取记录数
-                result = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}"))
+                result = conn.execute(text("SELECT COUNT(*) FROM " + tbl))
                 count = result.scalar()
                 
                 # 获取最后更新时间
-                result = conn.execute(text(f"""
+                result = conn.execute(text("""
                     SELECT UPDATE_TIME 
                     FROM information_schema.tables 
-                    WHERE table_schema = '{self.db_config.database}' 
-                    AND table_name = '{table_name}'
-                """))
+                    WHERE table_schema = :schema 
+                    AND table_name = :table
+                """), {'schema': self.db_config.database, 'table': table_name})
                 update_time = result.scalar()
                 
                 return {
@@ -60,42 +77,140 @@ class DataManager:
             logger.error(f"获取表 {table_name} 信息失败: {e}")
             return {}
     
+    def get_all_table_info(self, include_columns: bool = False) -> Dict[str, Dict[str, Any]]:
+        """一次查询获取所有表的信息，按表名返回
+        
+        record_count 取自 information_schema.tables.TABLE_ROWS，为估算值；
+        需要精确记录数时使用 get_table_info。
+        """
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT TABLE_NAME, TABLE_ROWS, UPDATE_TIME 
+                    FROM information_schema.tables 
+                    WHERE table_schema = :schema
+                """), {'schema': self.db_config.database})
+                
+                tables = {
+                    table_name: {
+                        'table_name': table_name,
+                        'record_count': table_rows or 0,
+                        'last_updated': update_time
+                    }
+                    for table_name, table_rows, update_time in result.fetchall()
+                }
+                
+                if include_columns:
+                    for info in tables.values():
+                        info['columns'] = []
+                    result = conn.execute(text("""
+                        SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE 
+                        FROM information_schema.columns 
+                        WHERE table_schema = :schema 
+                        ORDER BY TABLE_NAME, ORDINAL_POSITION
+                    """), {'schema': self.db_config.database})
+                    for table_name, column_name, column_type in result.fetchall():
+                        if table_name in tables:
+                            tables[table_name]['columns'].append({'name': column_name, 'type': column_type})
+                
+                return tables
+        except Exception as e:
+            logger.error(f"获取所有表信息失败: {e}")
+            return {}
+    
+    def get_row_estimate(self, table_name: str) -> Optional[int]:
+        """获取表的估算记录数（information_schema.tables.TABLE_ROWS，无需全表扫描）"""
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT TABLE_ROWS 
+                    FROM information_schema.tables 
+                    WHERE table_schema = :schema AND table_name = :table
+                """), {'schema': self.db_config.database, 'table': table_name})
+                return result.scalar()
+        except Exception as e:
+            logger.error(f"获取表 {table_name} 估算记录数失败: {e}")
+            return None
+    
+    def _query_sample(self, table_name: str, limit: int):
+        """查询表的前 limit 行，返回 (列名列表, 行元组列表)"""
+        with self.engine.connect() as conn:
+            tbl = self._safe_ident(conn, table_name)
+            result = conn.execute(text("SELECT * FROM " + tbl + " LIMIT :limit"), {'limit': int(limit)})
+            return list(result.keys()), [tuple(row) for row in result.fetchmany(limit)]
+    
+    def get_data_sample_raw(self, table_name: str, limit: int = 5) -> Optional[List[tuple]]:
+        """获取数据样本的原始行（不构建DataFrame，适合只需展示几行的调用方）"""
+        try:
+            return self._query_sample(table_name, limit)[1]
+        except Exception as e:
+            logger.error(f"获取表 {table_name} 数据样本失败: {e}")
+            return None
+    
     def get_data_sample(self, table_name: str, limit: int = 5) -> Optional[pd.DataFrame]:
         """获取数据样本"""
         try:
-            with self.engine.connect() as conn:
-                df = pd.read_sql(
-                    f"SELECT * FROM {table_name} LIMIT {limit}",
-                    conn
-                )
-                return df
+            columns, rows = self._query_sample(table_name, limit)
+            return pd.DataFrame.from_records(rows, columns=columns)
         except Exception as e:
             logger.error(f"获取表 {table_name} 数据样本失败: {e}")
             return None
     
-    def export_table_to_csv(self, table_name: str, output_path: str) -> bool:
-        """导出表数据到CSV"""
+    def export_table_to_csv(self, table_name: str, output_path: str, chunksize: int = 50_000) -> bool:
+        """导出表数据到CSV（分块读取并追加写入，内存占用与表大小无关）
+
+        mysql-connector 方言不支持 stream_results，read_sql 的 chunksize 仍会先缓冲整个结果集，
+        因此直接使用非缓冲游标逐批 fetchmany。
+        """
         try:
             with self.engine.connect() as conn:
-                df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
-                df.to_csv(output_path, index=False, encoding='utf-8-sig')
-                logger.info(f"表 {table_name} 已导出到 {output_path}")
-                return True
+                tbl = self._safe_ident(conn, table_name)
+            raw_conn = self.engine.raw_connection()
+            try:
+                cursor = raw_conn.cursor(buffered=False)
+                try:
+                    cursor.execute("SELECT * FROM " + tbl)
+                    columns = [col[0] for col in cursor.description]
+                    with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+                        first = True
+                        while True:
+                            rows = cursor.fetchmany(chunksize)
+                            if not rows:
+                                break
+                            pd.DataFrame.from_records(rows, columns=columns).to_csv(
+                                f, mode='a', header=first, index=False
+                            )
+                            first = False
+                finally:
+                    cursor.close()
+            finally:
+                raw_conn.close()
+            logger.info(f"表 {table_name} 已导出到 {output_path}")
+            return True
         except Exception as e:
             logger.error(f"导出表 {table_name} 失败: {e}")
             return False
     
-    def cleanup_old_data(self, table_name: str, days: int = 30) -> bool:
-        """清理旧数据"""
+    def cleanup_old_data(self, table_name: str, days: int = 30, batch_size: int = 10000) -> bool:
+        """清理旧数据（分批删除，每批单独提交以限制undo日志大小）"""
         try:
             with self.engine.connect() as conn:
-                # 假设表中有date或datetime列
-                conn.execute(text(f"""
-                    DELETE FROM {table_name} 
-                    WHERE DATE(created_at) < DATE_SUB(CURDATE(), INTERVAL {days} DAY)
-                """))
-                logger.info(f"已清理表 {table_name} 中 {days} 天前的数据")
+                tbl = self._safe_ident(conn, table_name)
+                # 假设表中有date或datetime列；条件中不对列套函数，以便使用 created_at 索引
+                delete_sql = text("""
+                    DELETE FROM """ + tbl + """ 
+                    WHERE created_at < DATE_SUB(CURDATE(), INTERVAL :days DAY)
+                    LIMIT :batch_size
+                """)
+                deleted = 0
+                while True:
+                    result = conn.execute(delete_sql, {'days': int(days), 'batch_size': int(batch_size)})
+                    conn.commit()
+                    deleted += result.rowcount
+                    if result.rowcount < batch_size:
+                        break
+                logger.info(f"已清理表 {table_name} 中 {days} 天前的数据，共 {deleted} 条")
                 return True
         except Exception as e:
             logger.error(f"清理表 {table_name} 旧数据失败: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -2,10 +2,13 @@
 数据转换工具 - 将键值对表转换为单行表
 """
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from typing import Optional, Dict, Any
 import logging
 
+from utils.data_manager import quote_table_name
+from utils.engine import get_engine
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,10 +17,11 @@ class DataTransformer:
     
     def __init__(self, db_config):
         self.db_config = db_config
-        self.engine = create_engine(
-            db_config.get_connection_string(),
-            **db_config.get_engine_config()
-        )
+        self.engine = get_engine(db_config)
+    
+    def _safe_ident(self, conn, table_name: str) -> str:
+        """校验表名并返回可直接拼入SQL的标识符"""
+        return quote_table_name(conn, self.db_config.database, table_name)
     
     def transform_key_value_to_row(self, source_table: str, target_table: str = None, 
                                   key_column: str = 'item', value_column: str = 'value') -> bool:
@@ -41,21 +45,19 @@ class DataTransformer:
             
             # 读取源数据
             with self.engine.connect() as conn:
-                df = pd.read_sql(f"SELECT * FROM {source_table}", conn)
+                df = pd.read_sql(text("SELECT * FROM " + self._safe_ident(conn, source_table)), conn)
             
             if df.empty:
                 logger.warning(f"表 {source_table} 为空")
                 return False
             
-            # 转换为单行格式
-            transformed_data = {}
-            for _, row in df.iterrows():
-                key = str(row[key_column]).strip()
-                value = str(row[value_column]).strip()
-                transformed_data[key] = value
-            
-            # 创建单行DataFrame
-            result_df = pd.DataFrame([transformed_data])
+            # 转换为单行格式：键列作为列名，值列作为唯一一行；
+            # 重复的键保留最后一个值，列顺序按键首次出现的顺序
+            values = df[value_column].map(str).str.strip()
+            values.index = df[key_column].map(str).str.strip()
+            values = values.groupby(level=0, sort=False).last()
+            result_df = values.to_frame().T.reset_index(drop=True)
+            result_df.columns.name = None
             
             logger.info(f"转换后的列: {list(result_df.columns)}")
             logger.info(f"数据预览: {result_df.iloc[0].to_dict()}")
@@ -101,7 +103,7 @@ class DataTransformer:
         try:
             transformed_table = f"{table_name}_transformed"
             with self.engine.connect() as conn:
-                df = pd.read_sql(f"SELECT * FROM {transformed_table}", conn)
+                df = pd.read_sql(text("SELECT * FROM " + self._safe_ident(conn, transformed_table)), conn)
                 return df
         except Exception as e:
             logger.error(f"获取转换后数据失败: {e}")
@@ -114,7 +116,7 @@ class DataTransformer:
             
             # 原始数据
             with self.engine.connect() as conn:
-                original_df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
+                original_df = pd.read_sql(text("SELECT * FROM " + self._safe_ident(conn, table_name)), conn)
             
             print("\n原始数据 (键值对格式):")
             print(original_df.to_string(index=False))
@@ -0,0 +1,12 @@
+"""
+工具脚本共享的数据库连接池
+"""
+from config.database_config import DatabaseConfig
+
+
+def get_pool():
+    """获取工具脚本共享的 mysql.connector 连接池（首次调用时创建）
+    
+    工具脚本以只读查询为主，连接归还时不重置会话。
+    """
+    return DatabaseConfig().get_mysql_pool(pool_name='akshare', pool_size=8, pool_reset_session=False)
@@ -0,0 +1,25 @@
+"""
+进程内共享的 SQLAlchemy 引擎
+"""
+from functools import lru_cache
+
+from sqlalchemy import create_engine
+
+from config.database_config import DatabaseConfig
+
+
+@lru_cache(maxsize=None)
+def _create_shared_engine(connection_string: str, engine_config: tuple):
+    """按连接字符串和引擎配置创建引擎，相同配置只创建一次"""
+    return create_engine(connection_string, **dict(engine_config))
+
+
+def get_engine(db_config: DatabaseConfig = None):
+    """获取共享的 SQLAlchemy 引擎，所有工具类复用同一个连接池
+    
+    连接池参数取自 db_config.get_engine_config()（可由 DB_POOL_* 环境变量配置）。
+    """
+    if db_config is None:
+        db_config = DatabaseConfig()
+    engine_config = tuple(sorted(db_config.get_engine_config().items()))
+    return _create_shared_engine(db_config.get_connection_string(), engine_config)
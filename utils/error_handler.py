@@ -2,11 +2,15 @@
 """
 错误处理工具类 - 提供统一的错误处理和重试机制
 """
+import re
+import sys
 import time
+import random
 import logging
-import traceback
-from functools import wraps
-from typing import Optional, Callable, Any, Dict, List
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache, wraps
+from typing import Optional, Callable, Any, Dict, List, Union, FrozenSet
 from enum import Enum
 import requests.exceptions
 import mysql.connector.errors
@@ -14,21 +18,97 @@ from sqlalchemy.exc import SQLAlchemyError
 
 
 class ErrorType(Enum):
-    """错误类型枚举"""
-    NETWORK_ERROR = "网络错误"
-    DATABASE_ERROR = "数据库错误"
-    API_ERROR = "API错误"
-    DATA_ERROR = "数据错误"
-    SYSTEM_ERROR = "系统错误"
-    UNKNOWN_ERROR = "未知错误"
+    """错误类型枚举，成员值为 (统计下标, 中文标签)"""
+    NETWORK_ERROR = (0, "网络错误")
+    DATABASE_ERROR = (1, "数据库错误")
+    API_ERROR = (2, "API错误")
+    DATA_ERROR = (3, "数据错误")
+    SYSTEM_ERROR = (4, "系统错误")
+    UNKNOWN_ERROR = (5, "未知错误")
+    
+    def __init__(self, idx: int, label: str):
+        self.idx = idx
+        self.label = sys.intern(label)
+
+
+# 异常类 -> 错误类型，classify_error 沿 type(error).__mro__ 查表
+_ERROR_MAP = {
+    requests.exceptions.RequestException: ErrorType.NETWORK_ERROR,
+    mysql.connector.errors.Error: ErrorType.DATABASE_ERROR,
+    SQLAlchemyError: ErrorType.DATABASE_ERROR,
+    ValueError: ErrorType.DATA_ERROR,
+    TypeError: ErrorType.DATA_ERROR,
+    KeyError: ErrorType.DATA_ERROR,
+    MemoryError: ErrorType.SYSTEM_ERROR,
+    OSError: ErrorType.SYSTEM_ERROR,
+}
+
+# 按异常类缓存查表结果
+_ERROR_TYPE_CACHE: Dict[type, ErrorType] = {}
+
+
+# (整秒, 格式化字符串)，整体替换以保证多线程下两者一致
+_ts_cache = (0, "")
+
+
+def _now_ts() -> str:
+    """当前时间字符串，按秒缓存 strftime 结果"""
+    global _ts_cache
+    sec = int(time.time())
+    cached_sec, ts = _ts_cache
+    if cached_sec != sec:
+        ts = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+        _ts_cache = (sec, ts)
+    return ts
+
+
+@dataclass(slots=True)
+class ErrorInfo:
+    """handle_error 返回的错误信息
+
+    保留 error_info['message'] 式的下标访问，兼容原先返回字典的调用方。
+    """
+    type: str
+    message: str
+    context: str
+    timestamp: str
+    recoverable: bool
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
 
 
 class RetryConfig:
-    """重试配置类"""
-    def __init__(self, max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0):
+    """重试配置类
+
+    jitter 可选 "none" / "equal" / "full" / "decorrelated"，用于打散
+    多个任务同时失败后的重试时间，避免集中重试。
+    """
+    def __init__(self, max_retries: int = 3, delay: float = 1.0, backoff: float = 2.0,
+                 jitter: str = "full", max_delay: float = 60.0):
+        if jitter not in ("none", "equal", "full", "decorrelated"):
+            raise ValueError(f"不支持的 jitter 类型: {jitter}")
         self.max_retries = max_retries
         self.delay = delay
         self.backoff = backoff
+        self.jitter = jitter
+        self.max_delay = max_delay
+    
+    def get_delay(self, attempt: int, prev_delay: float = None) -> float:
+        """计算第 attempt 次失败后的等待时间"""
+        if self.jitter == "decorrelated":
+            prev_delay = prev_delay or self.delay
+            return min(self.max_delay, random.uniform(self.delay, prev_delay * 3))
+        
+        base = min(self.max_delay, self.delay * (self.backoff ** attempt))
+        if self.jitter == "full":
+            return random.uniform(0, base)
+        if self.jitter == "equal":
+            return base / 2 + random.uniform(0, base / 2)
+        return base
 
 
 class ErrorHandler:
@@ -36,60 +116,54 @@ class ErrorHandler:
     
     def __init__(self, logger_name: str = __name__):
         self.logger = logging.getLogger(logger_name)
-        self.error_stats = {
-            ErrorType.NETWORK_ERROR: 0,
-            ErrorType.DATABASE_ERROR: 0,
-            ErrorType.API_ERROR: 0,
-            ErrorType.DATA_ERROR: 0,
-            ErrorType.SYSTEM_ERROR: 0,
-            ErrorType.UNKNOWN_ERROR: 0
-        }
+        # 按 ErrorType.idx 计数
+        self._stats = [0] * len(ErrorType)
     
     def classify_error(self, error: Exception) -> ErrorType:
         """分类错误类型"""
-        if isinstance(error, (requests.exceptions.RequestException, 
-                            requests.exceptions.ConnectionError,
-                            requests.exceptions.Timeout,
-                            requests.exceptions.HTTPError)):
-            return ErrorType.NETWORK_ERROR
-        
-        elif isinstance(error, (mysql.connector.errors.Error,
-                              SQLAlchemyError)):
-            return ErrorType.DATABASE_ERROR
-        
-        elif isinstance(error, (ValueError, TypeError, KeyError)):
-            return ErrorType.DATA_ERROR
+        error_cls = type(error)
+        error_type = _ERROR_TYPE_CACHE.get(error_cls)
+        if error_type is None:
+            error_type = ErrorType.UNKNOWN_ERROR
+            for cls in error_cls.__mro__:
+                mapped = _ERROR_MAP.get(cls)
+                if mapped is not None:
+                    error_type = mapped
+                    break
+            _ERROR_TYPE_CACHE[error_cls] = error_type
         
-        elif "akshare" in str(error).lower() or "api" in str(error).lower():
-            return ErrorType.API_ERROR
-        
-        elif isinstance(error, (OSError, IOError, MemoryError)):
-            return ErrorType.SYSTEM_ERROR
-        
-        else:
-            return ErrorType.UNKNOWN_ERROR
+        # 网络/数据库/数据错误按类型即可确定，其余再按消息判断是否为接口错误
+        if error_type in (ErrorType.SYSTEM_ERROR, ErrorType.UNKNOWN_ERROR):
+            message = str(error).lower()
+            if "akshare" in message or "api" in message:
+                return ErrorType.API_ERROR
+        return error_type
     
     def handle_error(self, error: Exception, context: str = "", 
-                    log_traceback: bool = True) -> Dict[str, Any]:
-        """处理错误并返回错误信息"""
-        error_type = self.classify_error(error)
-        self.error_stats[error_type] += 1
+                    log_traceback: bool = True,
+                    error_type: Optional[ErrorType] = None,
+                    log: bool = True) -> ErrorInfo:
+        """处理错误并返回错误信息
+
+        error_type 已知时不再重复分类；log=False 时只计数不写日志。
+        """
+        if error_type is None:
+            error_type = self.classify_error(error)
+        self._stats[error_type.idx] += 1
+        
+        message = str(error)
+        error_info = ErrorInfo(error_type.label, message, context, _now_ts(),
+                               self._is_recoverable(error_type))
         
-        error_info = {
-            'type': error_type.value,
-            'message': str(error),
-            'context': context,
-            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'recoverable': self._is_recoverable(error_type)
-        }
+        if not log:
+            return error_info
         
         # 记录日志
-        log_message = f"[{error_type.value}] {context}: {str(error)}"
+        log_message = f"[{error_type.label}] {context}: {message}"
         
         if error_type in [ErrorType.SYSTEM_ERROR, ErrorType.UNKNOWN_ERROR]:
-            self.logger.error(log_message)
-            if log_traceback:
-                self.logger.error(f"详细错误信息:\n{traceback.format_exc()}")
+            # 传入异常对象，由 logging 在真正输出时才格式化堆栈
+            self.logger.error(log_message, exc_info=error if log_traceback else None)
         elif error_type == ErrorType.DATABASE_ERROR:
             self.logger.error(log_message)
         elif error_type in [ErrorType.NETWORK_ERROR, ErrorType.API_ERROR]:
@@ -109,12 +183,11 @@ class ErrorHandler:
     
     def get_error_stats(self) -> Dict[str, int]:
         """获取错误统计"""
-        return {error_type.value: count for error_type, count in self.error_stats.items()}
+        return {error_type.label: self._stats[error_type.idx] for error_type in ErrorType}
     
     def reset_stats(self):
         """重置错误统计"""
-        for error_type in self.error_stats:
-            self.error_stats[error_type] = 0
+        self._stats = [0] * len(ErrorType)
 
 
 def retry_on_error(retry_config: RetryConfig = None, 
@@ -130,26 +203,40 @@ def retry_on_error(retry_config: RetryConfig = None,
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             last_error = None
+            delay = None
+            # 中间失败的 (尝试次数, 错误, 等待秒数)，结束时合并为一条日志
+            attempts_log = [] if error_handler.logger.isEnabledFor(logging.WARNING) else None
             
             for attempt in range(retry_config.max_retries + 1):
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
+                    if attempts_log:
+                        error_handler.logger.warning("%s 重试后成功，失败记录: %s", func.__name__, attempts_log)
+                    return result
                 
                 except Exception as e:
                     last_error = e
-                    error_info = error_handler.handle_error(
-                        e, 
-                        context=f"执行 {func.__name__} (尝试 {attempt + 1}/{retry_config.max_retries + 1})",
-                        log_traceback=(attempt == retry_config.max_retries)
-                    )
+                    # 先分类：最后一次尝试或不可恢复的错误记录一次堆栈后直接抛出
+                    error_type = error_handler.classify_error(e)
+                    give_up = (attempt == retry_config.max_retries
+                               or not error_handler._is_recoverable(error_type))
                     
-                    # 如果是最后一次尝试或错误不可恢复，直接抛出
-                    if attempt == retry_config.max_retries or not error_info['recoverable']:
+                    if give_up:
+                        if attempts_log:
+                            error_handler.logger.warning("%s 重试失败记录: %s", func.__name__, attempts_log)
+                        error_handler.handle_error(
+                            e, 
+                            context=f"执行 {func.__name__} (尝试 {attempt + 1}/{retry_config.max_retries + 1})",
+                            log_traceback=True,
+                            error_type=error_type
+                        )
                         break
                     
-                    # 等待后重试
-                    delay = retry_config.delay * (retry_config.backoff ** attempt)
-                    error_handler.logger.info(f"等待 {delay:.1f} 秒后重试...")
+                    # 中间失败只计数，等待后重试
+                    error_handler.handle_error(e, error_type=error_type, log=False)
+                    delay = retry_config.get_delay(attempt, delay)
+                    if attempts_log is not None:
+                        attempts_log.append((attempt + 1, f"[{error_type.label}] {e}", round(delay, 2)))
                     time.sleep(delay)
             
             # 所有重试都失败，抛出最后的错误
@@ -159,24 +246,43 @@ def retry_on_error(retry_config: RetryConfig = None,
     return decorator
 
 
+# A股代码：6位 ASCII 数字（str.isdigit 会放行全角等 Unicode 数字）
+_STOCK_CODE_RE = re.compile(r'\A[0-9]{6}\Z')
+
+
+@lru_cache(maxsize=32)
+def _is_valid_date(date_str: str, format_str: str) -> bool:
+    """按格式解析日期，结果缓存"""
+    try:
+        datetime.strptime(date_str, format_str)
+        return True
+    except ValueError:
+        return False
+
+
 class DataValidator:
     """数据验证器"""
     
     @staticmethod
-    def validate_dataframe(df, min_rows: int = 1, required_columns: List[str] = None) -> bool:
-        """验证DataFrame"""
+    def validate_dataframe(df, min_rows: int = 1,
+                           required_columns: Union[List[str], FrozenSet[str]] = None) -> bool:
+        """验证DataFrame
+
+        required_columns 可传列表或 frozenset，频繁调用时建议传模块级 frozenset 常量。
+        """
         if df is None:
             raise ValueError("DataFrame 不能为 None")
         
-        if df.empty:
-            raise ValueError("DataFrame 不能为空")
-        
-        if len(df) < min_rows:
-            raise ValueError(f"DataFrame 行数不足，需要至少 {min_rows} 行，实际 {len(df)} 行")
+        n = len(df)
+        if n < max(1, min_rows):
+            if n == 0:
+                raise ValueError("DataFrame 不能为空")
+            raise ValueError(f"DataFrame 行数不足，需要至少 {min_rows} 行，实际 {n} 行")
         
         if required_columns:
-            missing_columns = set(required_columns) - set(df.columns)
-            if missing_columns:
+            req = required_columns if isinstance(required_columns, frozenset) else frozenset(required_columns)
+            if len(df.columns.intersection(req)) != len(req):
+                missing_columns = set(req.difference(df.columns))
                 raise ValueError(f"DataFrame 缺少必需的列: {missing_columns}")
         
         return True
@@ -190,10 +296,9 @@ class DataValidator:
         if not isinstance(stock_code, str):
             raise ValueError("股票代码必须是字符串")
         
-        if len(stock_code) != 6:
-            raise ValueError("股票代码必须是6位数字")
-        
-        if not stock_code.isdigit():
+        if _STOCK_CODE_RE.match(stock_code) is None:
+            if len(stock_code) != 6:
+                raise ValueError("股票代码必须是6位数字")
             raise ValueError("股票代码必须是纯数字")
         
         return True
@@ -204,11 +309,9 @@ class DataValidator:
         if not date_str:
             raise ValueError("日期不能为空")
         
-        try:
-            time.strptime(date_str, format_str)
-            return True
-        except ValueError:
+        if not _is_valid_date(date_str, format_str):
             raise ValueError(f"日期格式错误，应为 {format_str} 格式")
+        return True
 
 
 class SafeExecutor:
@@ -1,13 +1,115 @@
 """
 日志工具类
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
 from datetime import datetime
+from json.encoder import encode_basestring as _json_escape
+
+_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+
+# 后台写日志的监听器，setup_logger 重复调用时先停止旧的
+_listener = None
+# 多个线程同时调用 setup_logger 时，保证根日志器上只有一组处理器
+_setup_lock = threading.Lock()
+
+
+def _stop_listener():
+    """停止后台日志线程，写完队列中剩余的记录后关闭其处理器（刷新并释放日志文件）"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+class FastJSONFormatter(logging.Formatter):
+    """按行输出 JSON (NDJSON) 的日志格式化器
+
+    直接拼接字符串，时间戳按整秒缓存，避免每条记录都调用 strftime。
+    """
+    
+    def __init__(self, datefmt: str = '%Y-%m-%d %H:%M:%S'):
+        super().__init__(datefmt=datefmt)
+        self._ts_cache = (None, '')
+    
+    def _cached_ts(self, created: float) -> str:
+        sec = int(created)
+        cached_sec, ts = self._ts_cache
+        if cached_sec != sec:
+            ts = time.strftime(self.datefmt, time.localtime(sec))
+            self._ts_cache = (sec, ts)
+        return ts
+    
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        return (f'{{"t":"{self._cached_ts(record.created)}","lv":"{record.levelname}",'
+                f'"n":{_json_escape(record.name)},"m":{_json_escape(message)}}}')
+
+
+class _LockFreeQueueHandler(logging.handlers.QueueHandler):
+    """入队时不获取处理器锁的 QueueHandler
+
+    SimpleQueue.put 本身线程安全，多线程同时记录日志时无需在
+    Handler.lock 上排队。
+    """
+    
+    def handle(self, record):
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """突发日志合并写盘的文件处理器
+
+    只在日志队列排空时 flush，突发期间的多条记录经文件缓冲区合并为
+    少量 write 调用，而不是每条记录一次。
+    """
+    
+    def __init__(self, filename: str, log_queue: queue.SimpleQueue, encoding: str = None):
+        super().__init__(filename, encoding=encoding)
+        self._queue = log_queue
+    
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if self._queue.empty():
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
 
 
 def setup_logger(log_level: str = None, log_file: str = None) -> logging.Logger:
-    """设置日志配置"""
+    """设置日志配置
+
+    根日志器只挂一个 QueueHandler，文件和控制台输出由后台 QueueListener
+    线程完成，调用方记录日志时不会阻塞在磁盘 I/O 上。
+    """
     
     # 获取日志级别
     if log_level is None:
@@ -25,23 +127,35 @@ def setup_logger(log_level: str = None, log_file: str = None) -> logging.Logger:
     
     # 获取根日志器
     logger = logging.getLogger()
-    logger.setLevel(getattr(logging, log_level.upper()))
-    
-    # 清除现有处理器
-    for handler in logger.handlers[:]:
-        logger.removeHandler(handler)
-    
-    # 文件处理器
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(getattr(logging, log_level.upper()))
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    # 控制台处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, log_level.upper()))
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    
+    with _setup_lock:
+        # 级别只设在根日志器上，处理器保持 NOTSET 直接继承
+        logger.setLevel(_LEVELS.get(log_level.upper(), logging.INFO))
+        
+        # 清除现有处理器
+        _stop_listener()
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+        
+        log_queue = queue.SimpleQueue()
+        
+        # 文件处理器
+        file_handler = _BatchedFileHandler(log_file, log_queue, encoding='utf-8')
+        file_handler.setFormatter(FastJSONFormatter())
+        
+        # 控制台处理器
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        
+        # 队列处理器：记录入队后由后台线程分发给文件和控制台处理器
+        logger.addHandler(_LockFreeQueueHandler(log_queue))
+        
+        global _listener
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        _listener.start()
     
     return logger
 
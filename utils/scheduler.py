@@ -1,10 +1,11 @@
 """
 数据同步调度器
 """
-import schedule
+import heapq
 import time
 import threading
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from controllers.akshare_sync_controller import AKShareSyncController
 from config.sync_config import SyncConfig
 import logging
@@ -20,36 +21,44 @@ class SyncScheduler:
         self.config = SyncConfig()
         self.running = False
         self.thread = None
+        # (下次运行的 monotonic 时间, 分类, 间隔秒数) 组成的最小堆
+        self._heap = []
+        self._stop_event = threading.Event()
+        # 到期任务交给线程池执行，同时到期的分类可以并发同步
+        # 最多4个线程，避免超出 AKShare 接口的频率限制
+        self._pool = None
+        self._running_categories = set()
+        self._running_lock = threading.Lock()
     
     def setup_schedules(self):
         """设置调度任务"""
-        # 股票数据 - 每5分钟同步一次
-        schedule.every(5).minutes.do(self._sync_category, 'stock')
+        intervals = [
+            ('stock', 5 * 60),       # 股票数据 - 每5分钟同步一次
+            ('futures', 3 * 60),     # 期货数据 - 每3分钟同步一次
+            ('fund', 10 * 60),       # 基金数据 - 每10分钟同步一次
+            ('bond', 30 * 60),       # 债券数据 - 每30分钟同步一次
+            ('forex', 60),           # 外汇数据 - 每1分钟同步一次
+            ('macro', 60 * 60),      # 宏观数据 - 每1小时同步一次
+            ('news', 15 * 60),       # 新闻数据 - 每15分钟同步一次
+            ('industry', 30 * 60),   # 行业数据 - 每30分钟同步一次
+        ]
         
-        # 期货数据 - 每3分钟同步一次
-        schedule.every(3).minutes.do(self._sync_category, 'futures')
-        
-        # 基金数据 - 每10分钟同步一次
-        schedule.every(10).minutes.do(self._sync_category, 'fund')
-        
-        # 债券数据 - 每30分钟同步一次
-        schedule.every(30).minutes.do(self._sync_category, 'bond')
-        
-        # 外汇数据 - 每1分钟同步一次
-        schedule.every(1).minutes.do(self._sync_category, 'forex')
-        
-        # 宏观数据 - 每1小时同步一次
-        schedule.every().hour.do(self._sync_category, 'macro')
-        
-        # 新闻数据 - 每15分钟同步一次
-        schedule.every(15).minutes.do(self._sync_category, 'news')
-        
-        # 行业数据 - 每30分钟同步一次
-        schedule.every(30).minutes.do(self._sync_category, 'industry')
+        now = time.monotonic()
+        self._heap = [(now + interval, category, interval) for category, interval in intervals]
+        heapq.heapify(self._heap)
         
         logger.info("调度任务设置完成")
     
     def _sync_category(self, category: str):
+        """提交指定分类的同步任务，上一轮未完成时跳过本轮"""
+        with self._running_lock:
+            if category in self._running_categories:
+                logger.warning(f"{category} 上一轮同步尚未完成，跳过本轮")
+                return
+            self._running_categories.add(category)
+        self._pool.submit(self._run_category, category)
+    
+    def _run_category(self, category: str):
         """同步指定分类的数据"""
         try:
             logger.info(f"开始定时同步 {category} 数据")
@@ -60,6 +69,9 @@ class SyncScheduler:
                 logger.warning(f"{category} 数据同步失败")
         except Exception as e:
             logger.error(f"同步 {category} 数据时发生错误: {e}")
+        finally:
+            with self._running_lock:
+                self._running_categories.discard(category)
     
     def start(self):
         """启动调度器"""
@@ -72,13 +84,20 @@ class SyncScheduler:
             return
         
         self.setup_schedules()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sync')
         self.running = True
+        self._stop_event.clear()
         
         def run_scheduler():
             logger.info("调度器已启动")
             while self.running:
-                schedule.run_pending()
-                time.sleep(1)
+                # 睡到最近一个任务到期，stop() 会提前唤醒
+                delay = max(0.0, self._heap[0][0] - time.monotonic())
+                if self._stop_event.wait(delay):
+                    break
+                _, category, interval = heapq.heappop(self._heap)
+                self._sync_category(category)
+                heapq.heappush(self._heap, (time.monotonic() + interval, category, interval))
             logger.info("调度器已停止")
         
         self.thread = threading.Thread(target=run_scheduler, daemon=True)
@@ -87,19 +106,24 @@ class SyncScheduler:
     def stop(self):
         """停止调度器"""
         self.running = False
+        self._stop_event.set()
         if self.thread:
             self.thread.join()
-        schedule.clear()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._heap = []
         self.controller.cleanup()
         logger.info("调度器已停止")
     
     def get_next_runs(self) -> list:
         """获取下次运行时间"""
-        jobs = schedule.get_jobs()
+        now_wall = datetime.now()
+        now = time.monotonic()
         return [
             {
-                'job': str(job.job_func),
-                'next_run': job.next_run.strftime('%Y-%m-%d %H:%M:%S') if job.next_run else 'N/A'
+                'job': f"sync {category} (每 {interval // 60} 分钟)",
+                'next_run': (now_wall + timedelta(seconds=max(0.0, next_run - now))).strftime('%Y-%m-%d %H:%M:%S')
             }
-            for job in jobs
+            for next_run, category, interval in sorted(self._heap)
         ]
\ No newline at end of file